@@ -1,4 +1,5 @@
-from typing import Generator
+import asyncio
+from typing import AsyncGenerator, Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
@@ -14,6 +15,15 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/users/login"
 )
 
+# Authentication is optional while the development bypass is in place
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/users/login",
+    auto_error=False
+)
+
+# Caps concurrent password checks so login storms queue instead of piling up
+_login_semaphore = asyncio.Semaphore(settings.LOGIN_MAX_CONCURRENCY)
+
 def get_db() -> Generator:
     try:
         db = SessionLocal()
@@ -22,14 +32,50 @@ def get_db() -> Generator:
         db.close()
 
 
+async def limit_login_concurrency() -> AsyncGenerator:
+    """
+    Hold one of LOGIN_MAX_CONCURRENCY login slots for the request.
+    Rejects with 503 if no slot frees up within LOGIN_QUEUE_TIMEOUT.
+    """
+    try:
+        await asyncio.wait_for(
+            _login_semaphore.acquire(), timeout=settings.LOGIN_QUEUE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        _login_semaphore.release()
+
+
 def get_current_user(
     db: Session = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2),
 ) -> models.User:
     """
-    Bypasses authentication for development.
-    Retrieves the first user from the database.
+    Resolves the user from the bearer token when one is sent.
+    Without a token, bypasses authentication for development and
+    retrieves the first user from the database.
+    Resolved users are served from a short-lived cache.
     """
-    user = crud.user.get(db, id=1)
+    if token:
+        subject = security.verify_access_token(token)
+        if subject is None:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        user = crud.user.get_cached(db, subject=subject)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+
+    user = crud.user.get_cached(db, subject="1")
     if not user:
         # This is a fallback in case you don't have any users in your DB yet.
         # It creates a default user.
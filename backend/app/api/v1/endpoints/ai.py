@@ -1,13 +1,30 @@
-import os
 import asyncio
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import hashlib
+import json
+import os
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core import events
 from app.core.config import settings
-from app.utils.video_processor import VideoProcessor
+from app.core.process_info import worker_id
+from app.core.response_cache import cached_json_response
+from app.core.render_scheduler import AdmissionError, scheduler
+from app.core.render_watchdog import DEFERRED, FAILED, REQUEUED
+from app.core.storage import storage
+from app.database import SessionLocal
+from app.utils.render_checkpoint import RenderCheckpoint, checkpoint_name
+from app.utils.render_instrumentation import create_instrumentation
+from app.utils.render_plan import RenderBudgetError, apply_budgets, plan_render
+from app.utils.proxies import proxy_path_for
 import logging
 
 router = APIRouter()
@@ -21,11 +38,18 @@ async def generate_video(
     trip_id: int,
     prompt: str = None,
     style: str = "cinematic",
-    background_tasks: BackgroundTasks,
+    preview: bool = False,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Generate AI video from trip media files
+
+    With preview=true the video is rendered at low resolution and frame
+    rate, which takes seconds, so style and order can be tried out before
+    committing to a full-quality render. A preview leaves the trip alone:
+    its state is reported on its render job (the status progress) and as
+    preview events on the status stream, the finished one with its
+    preview_url.
     """
     # Get trip
     trip = crud.trip.get(db=db, id=trip_id)
@@ -44,96 +68,524 @@ async def generate_video(
             detail="No media files found for this trip"
         )
     
-    # Update trip status
-    trip_update = schemas.TripUpdate(
-        status="processing",
-        prompt=prompt,
-        style=style
+    media_list = render_media_list(media_files)
+    title = trip.title or "My Travel Story"
+    output = render_settings(preview)
+    # Storage lookups (one per media item) may be S3 round trips; keep
+    # them off the event loop, and all of them ahead of the in-flight
+    # check below, so nothing awaits between that check and queueing
+    fingerprint = await run_in_threadpool(render_fingerprint, media_list, style, title, output)
+    has_proxy = await run_in_threadpool(find_proxies, media_list, output)
+    
+    # Identical render already finished: reuse its output
+    finished = crud.render_job.get_by_fingerprint(
+        db=db, fingerprint=fingerprint, statuses=["completed"]
     )
-    trip = crud.trip.update(db=db, db_obj=trip, obj_in=trip_update)
+    if (
+        finished and finished.output_path
+        and await run_in_threadpool(storage.exists, finished.output_path)
+    ):
+        logger.info(f"Reusing render job {finished.id} for trip {trip_id}")
+        crud.render_job.update(
+            db=db, db_obj=finished, obj_in={"last_used_at": datetime.now(timezone.utc)}
+        )
+        if preview:
+            publish_preview_event(
+                trip_id, finished.id, "completed", preview_url=output_url(finished.output_path)
+            )
+            return trip
+        trip = crud.trip.update(db=db, db_obj=trip, obj_in={
+            "status": "completed",
+            "prompt": prompt,
+            "style": style,
+            "generated_video_url": output_url(finished.output_path)
+        })
+        events.publish_trip_event(trip_id, **status_payload(trip))
+        return trip
     
-    # Start background video generation
-    background_tasks.add_task(
-        process_video_generation,
+    # Identical render in flight (double click, retry): attach to it.
+    # The check and the job it creates below run without an await in
+    # between, so identical requests cannot both pass it
+    running = crud.render_job.get_by_fingerprint(
+        db=db, fingerprint=fingerprint, statuses=["queued", "processing"]
+    )
+    if running:
+        logger.info(f"Render job {running.id} already running for trip {trip_id}")
+        return trip
+    
+    # Estimate frames, time and memory; refuse renders over budget and
+    # stream the ones too large to buffer
+    try:
+        plan = apply_budgets(plan_render(media_list, output, has_proxy), preview)
+    except RenderBudgetError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    # Refuse before touching the trip if the render queue cannot take it
+    try:
+        scheduler.check_admission(current_user.id)
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": "30"}
+        )
+    
+    # Previews go first, then short trips, then long ones
+    if preview:
+        lane = "preview"
+    elif len(media_list) <= settings.RENDER_SHORT_TRIP_MEDIA:
+        lane = "short"
+    else:
+        lane = "standard"
+    
+    # Update trip status; a preview does not change the trip
+    if not preview:
+        trip_update = schemas.TripUpdate(
+            status="processing",
+            prompt=prompt,
+            style=style
+        )
+        trip = crud.trip.update(db=db, db_obj=trip, obj_in=trip_update)
+        events.publish_trip_event(trip_id, **status_payload(trip))
+    
+    # Output name carries the fingerprint so different inputs never
+    # overwrite a finished video that another job points to
+    suffix = "_preview" if preview else ""
+    output_filename = f"trip_{trip_id}_{style}_{fingerprint[:12]}{suffix}.mp4"
+    output_path = storage.shard_key(output_filename)
+    
+    # Track this render's progress in its own job row
+    job = crud.render_job.create(
         db=db,
+        obj_in=schemas.RenderJobCreate(
+            trip_id=trip_id,
+            style=style,
+            media_total=len(media_files),
+            fingerprint=fingerprint,
+            output_path=output_path,
+            lane=lane,
+            plan=json.dumps(plan.as_dict()),
+            worker=worker_id()
+        )
+    )
+    if preview:
+        publish_preview_event(trip_id, job.id, "queued")
+    
+    # Queue video generation; admission was checked above and nothing
+    # has awaited since, so this cannot be refused
+    scheduler.submit(
+        current_user.id,
+        lane,
+        process_video_generation,
+        memory_mb=plan.peak_memory_mb,
         trip_id=trip_id,
-        media_files=media_files,
-        title=trip.title or "My Travel Story",
-        style=style
+        job_id=job.id,
+        media_files=media_list,
+        title=title,
+        style=style,
+        output_path=output_path,
+        preview=preview,
+        streaming=plan.streaming
     )
     
     return trip
 
 
+def render_media_list(media_files: list) -> list:
+    """
+    The render's media as plain dicts, in render order. The render gets
+    plain data only; the request session is closed by the time it runs.
+    Size, duration and frame rate from ingest let it be planned before it
+    is queued.
+    """
+    media_list = [
+        {
+            'path': media.file_path,
+            'type': media.file_type,
+            'filename': media.filename,
+            'mime_type': media.mime_type,
+            'width': media.width,
+            'height': media.height,
+            'duration': media.duration,
+            'frame_rate': media.frame_rate
+        }
+        for media in media_files
+    ]
+    
+    # Sort by creation time (if available) or by filename
+    media_list.sort(key=lambda x: x['filename'])
+    return media_list
+
+
+def render_settings(preview: bool) -> dict:
+    """Output settings for a full-quality or preview render"""
+    if preview:
+        return {
+            "fps": settings.VIDEO_PREVIEW_FPS,
+            "resolution": tuple(settings.VIDEO_PREVIEW_RESOLUTION),
+            "codec": settings.VIDEO_PREVIEW_CODEC,
+            "preview": True,
+        }
+    return {
+        "fps": settings.VIDEO_FPS,
+        "resolution": tuple(settings.VIDEO_RESOLUTION),
+        "codec": settings.VIDEO_CODEC,
+        "preview": False,
+    }
+
+
+def render_fingerprint(media_list: list, style: str, title: str, output: dict) -> str:
+    """
+    Identify a render by everything that affects its output: the ordered
+    media (path, size and mtime stand in for content hashes), style, title
+    and the video settings
+    """
+    media_identity = []
+    for media in media_list:
+        size, mtime_ns = storage.stat(media['path']) or (None, None)
+        media_identity.append([media['path'], media['type'], size, mtime_ns])
+    
+    payload = {
+        "media": media_identity,
+        "style": style,
+        "title": title,
+        "fps": output["fps"],
+        "resolution": list(output["resolution"]),
+        "codec": output["codec"],
+        "preview": output["preview"],
+        "font": settings.VIDEO_FONT_PATH,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def output_url(output_path: str) -> str:
+    return storage.url(output_path)
+
+
+def find_proxies(media_list: list, output: dict) -> list:
+    """Whether each media item has a render proxy for these output settings"""
+    return [
+        media['type'] == 'video' and storage.exists(
+            proxy_path_for(media['path'], output['resolution'], output['fps'])
+        )
+        for media in media_list
+    ]
+
+
+def localize_media(stack: ExitStack, media_list: list, output: dict) -> list:
+    """
+    Local files for the render, in order. Clips use their render proxy for
+    these output settings when ingest made one, so remote storage only has
+    to download the small proxy.
+    """
+    local_media = []
+    for media in media_list:
+        key = media['path']
+        if media['type'] == 'video':
+            proxy_key = proxy_path_for(key, output['resolution'], output['fps'])
+            if storage.exists(proxy_key):
+                key = proxy_key
+        local_media.append({**media, 'path': stack.enter_context(storage.local_path(key))})
+    return local_media
+
+
+def status_payload(trip: models.Trip) -> dict:
+    return {
+        "status": trip.status,
+        "video_url": trip.generated_video_url,
+        "title": trip.title
+    }
+
+
+def progress_payload(job: Optional[models.RenderJob]) -> Optional[dict]:
+    if job is None:
+        return None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "lane": job.lane,
+        "stage": job.stage,
+        "media_index": job.media_index,
+        "media_total": job.media_total,
+        "frames_written": job.frames_written,
+        "fps": job.fps,
+        "eta_seconds": job.eta_seconds,
+        "plan": json.loads(job.plan) if job.plan else None,
+        "video_url": (
+            output_url(job.output_path)
+            if job.status == "completed" and job.output_path else None
+        ),
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
+
+
+def render_checkpoint_for(output_path: str, media_total: int) -> Optional[RenderCheckpoint]:
+    """
+    Segment checkpoint of a render, so a render cut off by a dying worker
+    resumes where it stopped; None for renders of a single segment
+    """
+    segment_media = settings.RENDER_SEGMENT_MEDIA
+    if segment_media <= 0 or media_total <= segment_media:
+        return None
+    return RenderCheckpoint(
+        os.path.join(settings.RENDER_CHECKPOINT_DIR, checkpoint_name(output_path)),
+        media_total,
+        segment_media
+    )
+
+
+def update_render_job(job_id: int, **fields) -> None:
+    """
+    Update a render job row in its own short-lived session
+    """
+    db = SessionLocal()
+    try:
+        job = crud.render_job.get(db=db, id=job_id)
+        if job:
+            crud.render_job.update(db=db, db_obj=job, obj_in=fields)
+    finally:
+        db.close()
+
+
+class RenderProgressReporter:
+    """
+    Progress callback for VideoProcessor that persists to the render job and
+    notifies status subscribers at most once per RENDER_PROGRESS_INTERVAL
+    """
+    
+    def __init__(self, trip_id: int, job_id: int, interval: float, preview: bool = False):
+        self.trip_id = trip_id
+        self.job_id = job_id
+        self.interval = interval
+        self.preview = preview
+        self.last_reported = 0.0
+    
+    def __call__(self, progress: dict) -> None:
+        now = time.monotonic()
+        if progress['stage'] != "done" and now - self.last_reported < self.interval:
+            return
+        self.last_reported = now
+        
+        update_render_job(self.job_id, **progress)
+        if self.preview:
+            publish_preview_event(self.trip_id, self.job_id, "processing", **progress)
+            return
+        events.publish_trip_event(
+            self.trip_id,
+            status="processing",
+            progress={"job_id": self.job_id, **progress}
+        )
+
+
+def update_trip_status(trip_id: int, **fields) -> None:
+    """
+    Apply a trip status transition in its own short-lived session
+    and notify status stream subscribers
+    """
+    db = SessionLocal()
+    try:
+        trip = crud.trip.get(db=db, id=trip_id)
+        if not trip:
+            logger.warning(f"Trip {trip_id} disappeared during video generation")
+            return
+        trip = crud.trip.update(db=db, db_obj=trip, obj_in=schemas.TripUpdate(**fields))
+        payload = status_payload(trip)
+    finally:
+        db.close()
+    events.publish_trip_event(trip_id, **payload)
+
+
+def publish_preview_event(trip_id: int, job_id: int, status: str, **fields) -> None:
+    """
+    Notify status stream subscribers of a preview render. The event has
+    no trip status, so it neither changes nor ends the trip's stream.
+    """
+    preview_url = fields.pop("preview_url", None)
+    event = {"preview": {"job_id": job_id, "status": status, **fields}}
+    if preview_url:
+        event["preview_url"] = preview_url
+    events.publish_trip_event(trip_id, **event)
+
+
 def process_video_generation(
-    db: Session,
     trip_id: int,
+    job_id: int,
     media_files: list,
     title: str,
-    style: str
+    style: str,
+    output_path: str,
+    preview: bool = False,
+    streaming: bool = False
 ):
     """
     Background task to process video generation using OpenCV
+
+    Takes only IDs and plain dicts (with 'path' as a storage key, 'type',
+    'filename', in render order) so no database connection is held while
+    the render runs. output_path is the storage key of the video;
+    streaming comes from the render plan. Long renders are checkpointed in
+    segments, so running this again for the same job resumes it.
     """
+    # Imported here so API workers that never render do not load
+    # OpenCV, NumPy and PIL
+    from app.utils.video_processor import VideoProcessor
+    
     try:
         logger.info(f"Starting video generation for trip {trip_id}")
+        update_render_job(job_id, status="processing", worker=worker_id())
         
-        # Prepare output path
-        output_filename = f"trip_{trip_id}_{style}.mp4"
-        output_path = os.path.join(settings.UPLOAD_DIR, output_filename)
-        
-        # Prepare media files list
-        media_list = []
-        for media in media_files:
-            media_list.append({
-                'path': media.file_path,
-                'type': media.file_type,
-                'filename': media.filename
-            })
+        output = render_settings(preview)
+        checkpoint = render_checkpoint_for(output_path, len(media_files))
+        if checkpoint and checkpoint.resumed_segments:
+            logger.info(
+                f"Resuming render job {job_id} from {checkpoint.resumed_segments} "
+                f"of {len(checkpoint.segments)} finished segments"
+            )
+        instrumentation = create_instrumentation(
+            settings.RENDER_METRICS_ENABLED,
+            profile_sample_rate=settings.RENDER_PROFILE_SAMPLE_RATE
+        )
         
-        # Sort by creation time (if available) or by filename
-        media_list.sort(key=lambda x: x['filename'])
+        # Render from local copies into a local file that is published
+        # to storage only if the render succeeds
+        with ExitStack() as stack:
+            media_list = localize_media(stack, media_files, output)
+            local_output = stack.enter_context(storage.writable_path(output_path))
+            
+            # Create video processor with style
+            processor = VideoProcessor(
+                output_path=local_output,
+                **output,
+                style=style,  # Pass style parameter
+                instrumentation=instrumentation,
+                font_path=settings.VIDEO_FONT_PATH,
+                hw_decode=settings.VIDEO_HW_DECODE,
+                streaming=streaming
+            )
+            
+            # Generate video
+            success = processor.create_video_from_media(
+                media_files=media_list,
+                title=title,
+                add_intro=True,
+                add_outro=True,
+                progress_callback=RenderProgressReporter(
+                    trip_id, job_id, settings.RENDER_PROGRESS_INTERVAL, preview=preview
+                ),
+                checkpoint=checkpoint
+            )
+            if not success:
+                raise Exception("Video generation failed")
         
-        # Create video processor with style
-        processor = VideoProcessor(
-            output_path=output_path,
-            fps=settings.VIDEO_FPS,
-            resolution=settings.VIDEO_RESOLUTION,
-            codec=settings.VIDEO_CODEC,
-            style=style  # Pass style parameter
-        )
+        # Finished segments stay for a retry of a failed render, not after this
+        if checkpoint:
+            checkpoint.discard()
         
-        # Generate video
-        success = processor.create_video_from_media(
-            media_files=media_list,
-            title=title,
-            add_intro=True,
-            add_outro=True
+        finished_at = datetime.now(timezone.utc)
+        update_render_job(
+            job_id,
+            status="completed",
+            metrics=json.dumps(instrumentation.summary()) if instrumentation.enabled else None,
+            output_size=(storage.stat(output_path) or (None, None))[0],
+            finished_at=finished_at,
+            last_used_at=finished_at
         )
         
-        if success:
-            # Update trip with generated video URL
-            video_url = f"/uploads/{output_filename}"
-            trip_update = schemas.TripUpdate(
+        # Update trip with generated video URL; a preview is only reported
+        # on the job and in the event, keeping the trip as it is
+        video_url = output_url(output_path)
+        if preview:
+            publish_preview_event(trip_id, job_id, "completed", preview_url=video_url)
+        else:
+            update_trip_status(
+                trip_id,
                 generated_video_url=video_url,
                 status="completed"
             )
-            
-            # Get fresh trip object
-            trip = crud.trip.get(db=db, id=trip_id)
-            crud.trip.update(db=db, db_obj=trip, obj_in=trip_update)
-            
-            logger.info(f"Video generation completed for trip {trip_id}")
-        else:
-            raise Exception("Video generation failed")
+        
+        logger.info(f"Video generation completed for trip {trip_id}")
         
     except Exception as e:
         logger.error(f"Error generating video for trip {trip_id}: {str(e)}")
         
-        # Update trip status to failed
-        trip = crud.trip.get(db=db, id=trip_id)
-        trip_update = schemas.TripUpdate(status="failed")
-        crud.trip.update(db=db, db_obj=trip, obj_in=trip_update)
+        # Update trip status to failed; a failed preview fails only its job
+        try:
+            if preview:
+                publish_preview_event(trip_id, job_id, "failed", error=str(e))
+            else:
+                update_trip_status(trip_id, status="failed")
+            update_render_job(
+                job_id,
+                status="failed",
+                error=str(e),
+                finished_at=datetime.now(timezone.utc)
+            )
+        except Exception as db_error:
+            logger.error(f"Could not mark trip {trip_id} as failed: {str(db_error)}")
+
+
+def resume_render_job(db: Session, job: models.RenderJob) -> str:
+    """
+    Requeue a render whose worker died, for the render watchdog. It
+    continues from its checkpoint. Renders out of attempts, or whose trip
+    or media changed since, are marked failed instead.
+    """
+    def fail(error: str) -> str:
+        crud.render_job.update(db=db, db_obj=job, obj_in={
+            "status": "failed",
+            "error": error,
+            "finished_at": datetime.now(timezone.utc)
+        })
+        if trip is not None and job.lane == "preview":
+            publish_preview_event(trip.id, job.id, "failed", error=error)
+        elif trip is not None:
+            latest = crud.render_job.get_latest_for_trip(db=db, trip_id=job.trip_id, previews=False)
+            if latest is not None and latest.id == job.id:
+                update_trip_status(trip.id, status="failed")
+        logger.warning(f"Render job {job.id} failed: {error}")
+        return FAILED
+    
+    trip = job.trip
+    attempts = job.attempts or 1
+    if trip is None:
+        return fail("Trip was deleted")
+    if attempts >= settings.RENDER_MAX_ATTEMPTS:
+        return fail(f"Render worker died {attempts} times")
+    
+    preview = job.lane == "preview"
+    media_list = render_media_list(crud.media_file.get_by_trip(db=db, trip_id=trip.id))
+    title = trip.title or "My Travel Story"
+    if render_fingerprint(media_list, job.style, title, render_settings(preview)) != job.fingerprint:
+        return fail("Trip media or title changed before the render finished")
+    
+    try:
+        scheduler.check_admission(trip.owner_id)
+    except AdmissionError:
+        return DEFERRED
+    
+    # Claim the job before queueing it so the render's own updates come last
+    crud.render_job.update(db=db, db_obj=job, obj_in={
+        "status": "queued",
+        "worker": worker_id(),
+        "attempts": attempts + 1
+    })
+    plan = json.loads(job.plan) if job.plan else {}
+    scheduler.submit(
+        trip.owner_id,
+        job.lane or "standard",
+        process_video_generation,
+        memory_mb=plan.get("peak_memory_mb", 0.0),
+        trip_id=trip.id,
+        job_id=job.id,
+        media_files=media_list,
+        title=title,
+        style=job.style,
+        output_path=job.output_path,
+        preview=preview,
+        streaming=plan.get("strategy") == "streaming"
+    )
+    logger.info(f"Requeued render job {job.id} of trip {trip.id} (attempt {job.attempts})")
+    return REQUEUED
 
 
 @router.get("/status/{trip_id}")
@@ -144,7 +596,7 @@ async def get_generation_status(
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get video generation status
+    Get video generation status, with progress of the latest render
     """
     trip = crud.trip.get(db=db, id=trip_id)
     if not trip:
@@ -153,16 +605,62 @@ async def get_generation_status(
     if trip.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    return {
-        "status": trip.status,
-        "video_url": trip.generated_video_url,
-        "title": trip.title
-    }
+    job = crud.render_job.get_latest_for_trip(db=db, trip_id=trip_id)
+    return {**status_payload(trip), "progress": progress_payload(job)}
+
+
+@router.get("/events/{trip_id}")
+async def stream_generation_status(
+    *,
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    trip_id: int,
+    current_user: models.User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream video generation status as server-sent events
+
+    Sends the current status first, then every transition published by the
+    render task, and closes once the trip is completed or failed.
+    """
+    trip = crud.trip.get(db=db, id=trip_id)
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    
+    if trip.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    # Subscribe before taking the snapshot so no transition slips between them
+    subscription = events.broker.subscribe(events.trip_channel(trip_id))
+    snapshot = {"trip_id": trip_id, **status_payload(trip)}
+    
+    async def event_stream():
+        try:
+            yield events.format_sse(snapshot)
+            if events.is_terminal(snapshot):
+                return
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=settings.STATUS_STREAM_HEARTBEAT)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.format_sse(event)
+                if events.is_terminal(event):
+                    return
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/video/{trip_id}")
 async def get_video(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     trip_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -180,9 +678,17 @@ async def get_video(
     if not trip.generated_video_url:
         raise HTTPException(status_code=404, detail="Video not generated yet")
     
-    return {
-        "video_url": trip.generated_video_url,
-        "status": trip.status,
-        "title": trip.title,
-        "style": trip.style
-    }
\ No newline at end of file
+    return cached_json_response(
+        request,
+        user_id=current_user.id,
+        trip_id=trip.id,
+        name="video",
+        version=crud.trip.get_version(trip),
+        last_modified=trip.updated_at or trip.created_at,
+        build=lambda: {
+            "video_url": trip.generated_video_url,
+            "status": trip.status,
+            "title": trip.title,
+            "style": trip.style
+        }
+    )
\ No newline at end of file
@@ -1,13 +1,16 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
+from app.core.response_cache import cached_json_response
+from app.api.v1.endpoints.upload import remove_stored_files
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Trip])
 def read_trips(
+    request: Request,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
@@ -15,7 +18,16 @@ def read_trips(
 ) -> Any:
     """Retrieve trips for current user."""
     trips = crud.trip.get_by_owner(db=db, owner_id=current_user.id, skip=skip, limit=limit)
-    return trips
+    # Media is only loaded when the list has to be serialized again
+    return cached_json_response(
+        request,
+        user_id=current_user.id,
+        trip_id=None,
+        name=f"trips:{skip}:{limit}",
+        version="|".join(crud.trip.get_version(trip) for trip in trips),
+        last_modified=max((trip.updated_at or trip.created_at for trip in trips), default=None),
+        build=lambda: [schemas.Trip.model_validate(trip) for trip in trips]
+    )
     # """Retrieve all trips (no auth)."""
     # trips = crud.trip.get_multi(db=db, skip=skip, limit=limit)  # Get all trips
     # return trips
@@ -34,6 +46,7 @@ def create_trip(
 @router.get("/{trip_id}", response_model=schemas.Trip)
 def read_trip(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     trip_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -44,7 +57,15 @@ def read_trip(
         raise HTTPException(status_code=404, detail="Trip not found")
     if trip.owner_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    return trip
+    return cached_json_response(
+        request,
+        user_id=current_user.id,
+        trip_id=trip.id,
+        name="trip",
+        version=crud.trip.get_version(trip),
+        last_modified=trip.updated_at or trip.created_at,
+        build=lambda: schemas.Trip.model_validate(trip)
+    )
 
 @router.put("/{trip_id}", response_model=schemas.Trip)
 def update_trip(
@@ -68,6 +89,7 @@ def delete_trip(
     *,
     db: Session = Depends(deps.get_db),
     trip_id: int,
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ) -> Any:
     """Delete a trip."""
@@ -76,5 +98,7 @@ def delete_trip(
         raise HTTPException(status_code=404, detail="Trip not found")
     if trip.owner_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    trip = crud.trip.remove(db=db, id=trip_id)
+    # Rows go in one transaction; files are deleted after the response
+    media_keys, output_keys = crud.trip.remove_with_media(db=db, id=trip_id)
+    background_tasks.add_task(remove_stored_files, media_keys, output_keys)
     return {"message": "Trip deleted successfully"}
\ No newline at end of file
@@ -1,14 +1,177 @@
+import asyncio
 import os
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from functools import partial
+from typing import Any, Callable, List, Tuple
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app import crud, models, schemas
 from app.api import deps
 from app.core.config import settings
-import aiofiles
+from app.core.response_cache import cached_json_response
+from app.core.storage import storage
+from app.utils.media_probe import MediaInfo, ProbeError, probe
+from app.utils.proxies import proxy_path_for, proxy_prefix
+from app.utils.render_plan import CLIP_MAX_DURATION
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def create_clip_proxies(video_keys: List[str]) -> None:
+    """
+    Background ingest job: transcode each uploaded clip once into a render
+    proxy at the configured resolution and fps, so renders skip decoding
+    the original, and into a preview-sized proxy for preview renders
+    """
+    # Imported here so the API does not load OpenCV until a clip arrives
+    from app.utils.video_processor import VideoProcessor
+    
+    processors = [
+        VideoProcessor(
+            output_path="",
+            fps=settings.VIDEO_FPS,
+            resolution=settings.VIDEO_RESOLUTION,
+            hw_decode=settings.VIDEO_HW_DECODE
+        )
+    ]
+    if settings.VIDEO_PREVIEW_PROXY_ENABLED:
+        processors.append(
+            VideoProcessor(
+                output_path="",
+                fps=settings.VIDEO_PREVIEW_FPS,
+                resolution=settings.VIDEO_PREVIEW_RESOLUTION,
+                hw_decode=settings.VIDEO_HW_DECODE,
+                preview=True
+            )
+        )
+    for video_key in video_keys:
+        try:
+            with storage.local_path(video_key) as video_path:
+                for processor in processors:
+                    proxy_key = proxy_path_for(video_key, processor.resolution, processor.fps)
+                    with storage.writable_path(proxy_key) as proxy_path:
+                        processor.create_proxy(
+                            video_path,
+                            max_duration=CLIP_MAX_DURATION,
+                            proxy_path=proxy_path
+                        )
+        except Exception as e:
+            logger.error(f"Error creating proxies for {video_key}: {str(e)}")
+
+
+def remove_media_files(file_key: str) -> None:
+    """Delete an uploaded file and any render proxies made from it"""
+    for key in [file_key] + storage.list(proxy_prefix(file_key)):
+        storage.delete(key)
+
+
+def remove_stored_files(media_keys: List[str], output_keys: List[str] = ()) -> None:
+    """
+    Background job: delete uploaded files with their proxies, and rendered
+    videos, after their rows are gone. Failures are left to media GC.
+    """
+    for key in media_keys:
+        try:
+            remove_media_files(key)
+        except Exception as e:
+            logger.error(f"Error deleting {key}: {str(e)}")
+    for key in output_keys:
+        try:
+            storage.delete(key)
+        except Exception as e:
+            logger.error(f"Error deleting {key}: {str(e)}")
+
+def probe_upload(file: UploadFile) -> MediaInfo:
+    """
+    Check from its headers that an upload is an intact image or video of
+    the kind its content type claims, without decoding it
+    """
+    try:
+        info = probe(file.file)
+    except ProbeError as e:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+    
+    claimed_kind = "image" if file.content_type.startswith("image/") else "video"
+    if info.kind != claimed_kind:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{file.filename} is a {info.format} {info.kind}, not {file.content_type}"
+        )
+    if info.width * info.height > settings.UPLOAD_MAX_PIXELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{file.filename} is {info.width}x{info.height}, larger than "
+                   f"{settings.UPLOAD_MAX_PIXELS} pixels"
+        )
+    return info
+
+
+def validate_upload(file: UploadFile) -> Tuple[int, MediaInfo]:
+    """Check an upload's type, size and headers; returns its size in bytes and media info"""
+    if file.content_type not in settings.ALLOWED_FILE_TYPES:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"File type {file.content_type} not allowed"
+        )
+    
+    # Measure the size without reading the upload into memory
+    file.file.seek(0, os.SEEK_END)
+    file_size = file.file.tell()
+    file.file.seek(0)
+    
+    if file_size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
+        )
+    return file_size, probe_upload(file)
+
+
+def store_upload(
+    file: UploadFile, file_size: int, info: MediaInfo, trip_id: int
+) -> schemas.MediaFileCreate:
+    """Write a validated upload to storage under a new unique key"""
+    file_extension = os.path.splitext(file.filename)[1]
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    file_key = storage.shard_key(unique_filename)
+    storage.save(file_key, file.file)
+    
+    return schemas.MediaFileCreate(
+        filename=unique_filename,
+        original_filename=file.filename,
+        file_path=file_key,
+        file_size=file_size,
+        mime_type=file.content_type,
+        file_type=info.kind,
+        trip_id=trip_id,
+        **info.as_dict()
+    )
+
+
+async def gather_bounded(calls: List[Callable[[], Any]], limit: int) -> List[Any]:
+    """
+    Run blocking calls in the threadpool, at most limit at once. Returns
+    results in order, with the exception in place of each call that failed.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(call):
+        async with semaphore:
+            return await run_in_threadpool(call)
+    
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+
+def raise_first_error(results: List[Any]) -> None:
+    for result in results:
+        if isinstance(result, HTTPException):
+            raise result
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
 
 @router.post("/files/", response_model=List[schemas.MediaFile])
 async def upload_files(
@@ -16,66 +179,57 @@ async def upload_files(
     db: Session = Depends(deps.get_db),
     trip_id: int = Form(...),
     files: List[UploadFile] = File(...),
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ):
-    """Upload multiple files for a trip."""
+    """
+    Upload multiple files for a trip.
+    
+    Files are validated, then written, several at a time; the request
+    stores all of them or none.
+    """
     # Verify trip ownership
     trip = crud.trip.get(db=db, id=trip_id)
     if not trip or trip.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    uploaded_files = []
+    # Validate every file before writing any
+    checked = await gather_bounded(
+        [partial(validate_upload, file) for file in files],
+        limit=settings.UPLOAD_CONCURRENCY
+    )
+    raise_first_error(checked)
     
-    for file in files:
-        # Validate file type
-        if file.content_type not in settings.ALLOWED_FILE_TYPES:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"File type {file.content_type} not allowed"
-            )
-        
-        # Validate file size
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
-        
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE} bytes"
-            )
-        
-        # Generate unique filename
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-        
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
-        
-        # Determine file type
-        file_type = "image" if file.content_type.startswith("image/") else "video"
-        
-        # Save to database
-        media_file_in = schemas.MediaFileCreate(
-            filename=unique_filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            file_size=file_size,
-            mime_type=file.content_type,
-            file_type=file_type,
-            trip_id=trip_id
-        )
-        
-        media_file = crud.media_file.create_with_trip(db=db, obj_in=media_file_in)
-        uploaded_files.append(media_file)
+    # Stream the uploads into storage
+    results = await gather_bounded(
+        [
+            partial(store_upload, file, size, info, trip_id)
+            for file, (size, info) in zip(files, checked)
+        ],
+        limit=settings.UPLOAD_CONCURRENCY
+    )
+    stored_keys = [r.file_path for r in results if isinstance(r, schemas.MediaFileCreate)]
+    
+    # One transaction for all rows; stored files go again if anything failed
+    try:
+        raise_first_error(results)
+        uploaded_files = crud.media_file.create_multi_with_trip(db=db, objs_in=results)
+    except Exception:
+        db.rollback()
+        await run_in_threadpool(remove_stored_files, stored_keys)
+        raise
+    
+    # Prepare render proxies for clips after the response is sent
+    video_keys = [m.file_path for m in uploaded_files if m.file_type == "video"]
+    if settings.VIDEO_PROXY_ENABLED and video_keys:
+        background_tasks.add_task(create_clip_proxies, video_keys)
     
     return uploaded_files
 
 @router.get("/trips/{trip_id}/files/", response_model=List[schemas.MediaFile])
 def get_trip_files(
     *,
+    request: Request,
     db: Session = Depends(deps.get_db),
     trip_id: int,
     current_user: models.User = Depends(deps.get_current_active_user),
@@ -85,14 +239,25 @@ def get_trip_files(
     if not trip or trip.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    files = crud.media_file.get_by_trip(db=db, trip_id=trip_id)
-    return files
+    return cached_json_response(
+        request,
+        user_id=current_user.id,
+        trip_id=trip.id,
+        name="files",
+        version=crud.trip.get_version(trip),
+        last_modified=trip.updated_at or trip.created_at,
+        build=lambda: [
+            schemas.MediaFile.model_validate(media)
+            for media in crud.media_file.get_by_trip(db=db, trip_id=trip_id)
+        ]
+    )
 
 @router.delete("/files/{file_id}")
 async def delete_file(
     *,
     db: Session = Depends(deps.get_db),
     file_id: int,
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(deps.get_current_active_user),
 ):
     """Delete a media file."""
@@ -105,12 +270,36 @@ async def delete_file(
     if not trip or trip.owner_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
-    # Delete file from filesystem
-    try:
-        os.remove(media_file.file_path)
-    except FileNotFoundError:
-        pass  # File already deleted from filesystem
-    
-    # Delete from database
+    # Delete from database, then the file (and its render proxies)
+    # from storage after the response is sent
+    file_key = media_file.file_path
     crud.media_file.remove(db=db, id=file_id)
-    return {"message": "File deleted successfully"}
\ No newline at end of file
+    background_tasks.add_task(remove_stored_files, [file_key])
+    return {"message": "File deleted successfully"}
+
+@router.post("/files/delete")
+async def delete_files(
+    *,
+    db: Session = Depends(deps.get_db),
+    files_in: schemas.MediaFileBulkDelete,
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(deps.get_current_active_user),
+):
+    """Delete several media files at once."""
+    file_ids = set(files_in.file_ids)
+    media_files = crud.media_file.get_multi_for_owner(
+        db=db, ids=list(file_ids), owner_id=current_user.id
+    )
+    
+    # All or nothing: unknown ids and other users' files fail the request
+    missing = file_ids - {media.id for media in media_files}
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Files not found: {sorted(missing)}"
+        )
+    
+    file_keys = [media.file_path for media in media_files]
+    deleted = crud.media_file.remove_multi(db=db, ids=list(file_ids))
+    background_tasks.add_task(remove_stored_files, file_keys)
+    return {"message": "Files deleted successfully", "deleted": deleted}
\ No newline at end of file
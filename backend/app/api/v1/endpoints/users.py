@@ -1,5 +1,6 @@
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
@@ -11,14 +12,18 @@ from datetime import timedelta
 
 router = APIRouter()
 
-@router.post("/login/access-token", response_model=schemas.Token)
-def login_access_token(
+@router.post(
+    "/login/access-token",
+    response_model=schemas.Token,
+    dependencies=[Depends(deps.limit_login_concurrency)],
+)
+async def login_access_token(
     db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await crud.user.authenticate_async(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -33,8 +38,12 @@ def login_access_token(
         "token_type": "bearer",
     }
 
-@router.post("/users/", response_model=schemas.User)
-def create_user(
+@router.post(
+    "/users/",
+    response_model=schemas.User,
+    dependencies=[Depends(deps.limit_login_concurrency)],
+)
+async def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: schemas.UserCreate,
@@ -42,13 +51,14 @@ def create_user(
     """
     Create new user.
     """
-    user = crud.user.get_by_email(db, email=user_in.email)
+    # The endpoint is async for the password hashing; keep SQL off the event loop
+    user = await run_in_threadpool(crud.user.get_by_email, db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
-    user = crud.user.create(db, obj_in=user_in)
+    user = await crud.user.create_async(db, obj_in=user_in)
     return user
 
 @router.get("/users/me", response_model=schemas.User)
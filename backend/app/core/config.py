@@ -14,11 +14,41 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "trip-tales-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_TTL_SECONDS: int = 60  # How long a resolved user is reused
+    USER_CACHE_MAX_SIZE: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: int = 300  # Serialized trip and media reads
+    RESPONSE_CACHE_MAX_SIZE: int = 2048  # (user, trip) entries
+    BCRYPT_ROUNDS: int = 12  # Cost factor for new password hashes
+    PASSWORD_HASH_WORKERS: int = 2  # Processes reserved for bcrypt
+    LOGIN_MAX_CONCURRENCY: int = 8  # Logins hashing at once per API worker
+    LOGIN_QUEUE_TIMEOUT: float = 5.0  # Seconds a login waits for a slot
     
     # File Upload
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
     ALLOWED_FILE_TYPES: List[str] = ["image/jpeg", "image/png", "image/gif", "video/mp4", "video/avi", "video/mov"]
     UPLOAD_DIR: str = "uploads"
+    UPLOAD_CONCURRENCY: int = 8  # Files of one upload request validated and written at once
+    UPLOAD_MAX_PIXELS: int = 100_000_000  # Larger images and video frames are rejected at upload
+    
+    # Storage for uploads, proxies and rendered videos
+    STORAGE_BACKEND: str = "local"  # "local" (UPLOAD_DIR) or "s3"
+    STORAGE_SHARD_DEPTH: int = 2  # Hash-prefix directory levels for new files
+    STORAGE_CACHE_DIR: str = "uploads/.cache"  # Local copies of remote files for rendering
+    S3_BUCKET: Optional[str] = None
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO or a local stand-in server
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    
+    # Garbage collection of orphaned media and old renders
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: float = 60.0  # Pause between passes; each pass sweeps one storage shard
+    GC_BATCH_SIZE: int = 200  # Max deletions per pass
+    GC_MAX_DELETES_PER_SECOND: float = 20.0  # Paces deletions to leave I/O for live traffic
+    GC_GRACE_SECONDS: int = 3600  # Unreferenced files younger than this are kept (uploads in flight)
+    RENDER_RETENTION_DAYS: int = 30  # Delete renders unused for this long; 0 keeps them
+    RENDER_STORAGE_MAX_BYTES: int = 0  # Evict least recently used renders above this; 0 = no limit
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -28,6 +58,12 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
     
+    # Request instrumentation
+    REQUEST_METRICS_ENABLED: bool = True  # Route latency and per-request SQL metrics on /metrics
+    SLOW_REQUEST_THRESHOLD_MS: int = 1000  # Log slower requests with their SQL; 0 disables
+    SLOW_REQUEST_MAX_STATEMENTS: int = 20  # Statements kept per request for the slow log
+    API_RSS_BUDGET_MB: int = 150  # Memory an API worker should stay under before rendering; 0 disables
+    
     # AI Service (placeholder for future integration)
     AI_SERVICE_URL: Optional[str] = None
     AI_SERVICE_API_KEY: Optional[str] = None
@@ -38,6 +74,58 @@ class Settings(BaseSettings):
     VIDEO_CODEC: str = "mp4v"  # or "avc1" for H.264
     PHOTO_DURATION: int = 1  # Duration per photo in seconds
     TRANSITION_FRAMES: int = 15  # Frames for fade transitions (0.5s at 30fps)
+    VIDEO_FONT_PATH: Optional[str] = None  # TrueType font for text overlays; Hershey if unset
+    VIDEO_HW_DECODE: bool = False  # Hardware-accelerated clip decoding, if OpenCV supports it
+    VIDEO_PROXY_ENABLED: bool = True  # Transcode uploaded clips into render proxies at ingest
+    
+    # Preview renders: same pipeline, cheaper settings
+    VIDEO_PREVIEW_FPS: int = 15
+    VIDEO_PREVIEW_RESOLUTION: tuple = (854, 480)  # 480p
+    VIDEO_PREVIEW_CODEC: str = "mp4v"  # Fastest encoder OpenCV ships everywhere
+    VIDEO_PREVIEW_PROXY_ENABLED: bool = True  # Also make preview-sized proxies at ingest
+    
+    RENDER_WORKERS: int = 2  # Renders running at once per API process
+    RENDER_MAX_PER_USER: int = 1  # Renders one user may have running at once
+    RENDER_QUEUE_MAX: int = 50  # Queued renders before new ones are refused
+    RENDER_MAX_QUEUED_PER_USER: int = 5
+    RENDER_SHORT_TRIP_MEDIA: int = 20  # Trips with at most this many files use the short lane
+    RENDER_SHUTDOWN_TIMEOUT: float = 60.0  # Seconds to wait for queued renders on shutdown
+    RENDER_PROGRESS_INTERVAL: float = 2.0  # Min seconds between persisted progress updates
+    RENDER_METRICS_ENABLED: bool = True  # Per-stage render timings and /metrics export
+    RENDER_PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of renders run under cProfile
+    
+    # Render budgets, checked against each render's plan before it is queued
+    RENDER_MAX_FRAMES: int = 54000  # Longest video, in output frames (30 min at 30 fps); 0 = no limit
+    RENDER_MAX_ESTIMATED_SECONDS: float = 1800.0  # Renders estimated to take longer are refused; 0 = no limit
+    RENDER_MEMORY_BUDGET_MB: int = 1024  # Renders that would buffer more stream frames instead
+    RENDER_PROCESS_MEMORY_MB: int = 2048  # Planned memory of all renders running in a process; 0 = no limit
+    
+    # Crash recovery: renders are checkpointed in segments and requeued if their worker dies
+    RENDER_SEGMENT_MEDIA: int = 10  # Media per checkpointed segment; 0 renders in one piece
+    RENDER_CHECKPOINT_DIR: str = "var/renders"  # Local to the rendering host; keep outside UPLOAD_DIR
+    RENDER_CHECKPOINT_MAX_AGE_HOURS: int = 48  # Segments of abandoned renders are deleted after this
+    RENDER_WATCHDOG_ENABLED: bool = True
+    RENDER_WATCHDOG_INTERVAL: float = 30.0  # Seconds between checks for dead renders
+    RENDER_STALE_SECONDS: int = 1800  # Renders from other hosts without progress or heartbeat this long are presumed dead
+    RENDER_HEARTBEAT_INTERVAL: float = 60.0  # Seconds between heartbeats of renders queued or running; well below RENDER_STALE_SECONDS
+    RENDER_MAX_ATTEMPTS: int = 3  # Times a render is queued before it is marked failed
+    
+    # Generation status events
+    STATUS_BROKER: str = "memory"  # "memory" (single process) or "file" (multi-process, one host)
+    STATUS_EVENTS_DIR: str = "var/events"  # Keep outside UPLOAD_DIR, which is served publicly
+    STATUS_STREAM_HEARTBEAT: float = 15.0  # Seconds between SSE keep-alive comments
+    
+    # Production server (serve.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # Worker processes; 0 means one per CPU
+    SERVER_PRELOAD: bool = True  # Import the app once before forking workers
+    SERVER_BACKLOG: int = 2048  # Connections the listening socket queues before refusing
+    SERVER_KEEPALIVE_SECONDS: int = 75  # Keep longer than the load balancer's idle timeout
+    SERVER_LIMIT_CONCURRENCY: int = 0  # Connections per worker before answering 503; 0 = unlimited
+    SERVER_MAX_REQUESTS: int = 0  # Requests before a worker is replaced; 0 = never
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # Seconds in-flight requests and uploads get on shutdown
+    SERVER_HEARTBEAT_INTERVAL: float = 5.0  # Seconds between worker health updates
     
     class Config:
         env_file = ".env"
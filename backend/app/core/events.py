@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+# Statuses after which a trip produces no further events
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class Subscription(ABC):
+    """A single listener for the events of one channel"""
+
+    @abstractmethod
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to timeout seconds for the next event"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop listening"""
+
+
+class _MemorySubscription(Subscription):
+    def __init__(self, broker: "InMemoryBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker._unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Pub/sub within one process. publish() may be called from any thread
+    (render tasks run in the threadpool); events are handed to each
+    subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[_MemorySubscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = _MemorySubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscription)
+        return subscription
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, event)
+            except RuntimeError:
+                # Subscriber's loop has shut down
+                self._unsubscribe(subscription)
+
+    def _unsubscribe(self, subscription: _MemorySubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.channel, None)
+
+
+class _FileSubscription(Subscription):
+    def __init__(self, path: str, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.pending: List[Dict[str, Any]] = []
+        self.file = None
+        # Only events published after subscribing are delivered
+        self._open(at_end=True)
+
+    def _open(self, at_end: bool) -> None:
+        try:
+            self.file = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            self.file = None
+            return
+        if at_end:
+            self.file.seek(0, os.SEEK_END)
+        self.partial = ""
+
+    def _read_lines(self) -> None:
+        # Leave a partially written line for the next poll
+        complete, _, self.partial = (self.partial + self.file.read()).rpartition("\n")
+        for line in complete.split("\n"):
+            if line:
+                self.pending.append(json.loads(line))
+
+    def _read_new(self) -> None:
+        if self.file is None:
+            self._open(at_end=False)
+            if self.file is None:
+                return
+        self._read_lines()
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = False
+        if replaced:
+            # The channel was trimmed to its final event: finish the old
+            # file through the open handle, then read the new one
+            self._read_lines()
+            self.file.close()
+            self._open(at_end=False)
+            if self.file is not None:
+                self._read_lines()
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if not self.pending:
+                self._read_new()
+            if self.pending:
+                return self.pending.pop(0)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class FileBroker:
+    """
+    Local stand-in for a shared broker when renders and API requests run in
+    different processes on one host. Each channel is a JSON lines file
+    under STATUS_EVENTS_DIR that subscribers tail. Events are appended
+    while a render runs; its final event replaces the file, so a channel
+    keeps only its last event between renders.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 0.5):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, channel: str) -> str:
+        return os.path.join(self.directory, f"{channel}.jsonl")
+
+    def subscribe(self, channel: str) -> Subscription:
+        return _FileSubscription(self._path(channel), self.poll_interval)
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        line = json.dumps(event) + "\n"
+        path = self._path(channel)
+        with self._lock:
+            if not is_terminal(event):
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                return
+            # A new file (new inode) tells subscribers to start over at its
+            # one line, the final event
+            temp_path = path + ".part"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(line)
+            os.replace(temp_path, path)
+
+
+def _create_broker():
+    if settings.STATUS_BROKER == "file":
+        return FileBroker(settings.STATUS_EVENTS_DIR)
+    return InMemoryBroker()
+
+
+broker = _create_broker()
+
+
+def trip_channel(trip_id: int) -> str:
+    return f"trip_{trip_id}"
+
+
+def publish_trip_event(trip_id: int, **event: Any) -> None:
+    broker.publish(trip_channel(trip_id), {"trip_id": trip_id, **event})
+
+
+def format_sse(event: Dict[str, Any], name: str = "status") -> str:
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+def is_terminal(event: Dict[str, Any]) -> bool:
+    return event.get("status") in TERMINAL_STATUSES
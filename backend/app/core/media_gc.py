@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.storage import storage
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+registry.describe("gc_deleted_total", "counter", "Files and rows removed by media GC, by kind")
+registry.describe("gc_bytes_freed_total", "counter", "Bytes of storage freed by media GC")
+registry.describe("gc_pass_seconds", "histogram", "Duration of one media GC pass")
+
+# Marks files left behind by an interrupted write (see storage._part_path)
+PART_MARKER = ".part."
+PROXY_MARKER = ".proxy_"
+
+
+class MediaGarbageCollector:
+    """
+    Removes what nothing refers to any more, a little at a time, on a
+    background thread:
+
+    - media rows and render jobs of deleted trips, with their files
+    - completed renders unused for retention_days, or least recently
+      used ones while renders take more than render_max_bytes
+    - stored files no media row, render job or trip video URL refers to
+      (one top-level storage shard per pass)
+
+    A pass deletes at most batch_size things, paced at
+    max_deletes_per_second so it does not compete with live I/O.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        max_deletes_per_second: float,
+        grace_seconds: int,
+        retention_days: int,
+        render_max_bytes: int
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.delete_pause = 1.0 / max_deletes_per_second if max_deletes_per_second > 0 else 0.0
+        self.grace_seconds = grace_seconds
+        self.retention_days = retention_days
+        self.render_max_bytes = render_max_bytes
+        # Storage shards swept in turn: files from before sharding, then 00/ .. ff/
+        self.shards: List[Optional[str]] = [None]
+        if storage.shard_depth > 0:
+            self.shards += [f"{i:02x}" for i in range(256)]
+        self._cursor = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_pass: Dict[str, Any] = {}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="media-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None,
+            "next_shard": self.shards[self._cursor],
+            "last_pass": self.last_pass,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_pass()
+            except Exception:
+                logger.exception("Media GC pass failed")
+
+    def run_pass(self) -> Dict[str, Any]:
+        """Collect one batch, then sweep the next storage shard"""
+        started = time.perf_counter()
+        self._deleted: Counter = Counter()
+        self._budget = self.batch_size
+        shard = self.shards[self._cursor]
+
+        db = SessionLocal()
+        try:
+            self._collect_deleted_trips(db)
+            self._collect_old_renders(db)
+            self._sweep_shard(db, shard)
+        finally:
+            db.close()
+        self._cursor = (self._cursor + 1) % len(self.shards)
+
+        elapsed = time.perf_counter() - started
+        registry.observe("gc_pass_seconds", elapsed)
+        self.last_pass = {
+            "shard": shard,
+            "deleted": dict(self._deleted),
+            "seconds": round(elapsed, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if self._deleted:
+            logger.info(f"Media GC pass over shard {shard}: {dict(self._deleted)}")
+        return self.last_pass
+
+    def _exhausted(self) -> bool:
+        return self._budget <= 0 or self._stop.is_set()
+
+    def _delete_key(self, key: str, kind: str, size: Optional[int] = None) -> None:
+        """Delete one stored file, paced by delete_pause"""
+        if size is None:
+            size = (storage.stat(key) or (0, 0))[0]
+        storage.delete(key)
+        self._budget -= 1
+        self._deleted[kind] += 1
+        registry.inc("gc_deleted_total", kind=kind)
+        registry.inc("gc_bytes_freed_total", size)
+        if self.delete_pause:
+            self._stop.wait(self.delete_pause)
+
+    def _delete_media(self, key: str, kind: str) -> None:
+        """Delete an uploaded file and its render proxies"""
+        for proxy_key in storage.list(os.path.splitext(key)[0] + PROXY_MARKER):
+            self._delete_key(proxy_key, kind)
+        self._delete_key(key, kind)
+
+    def _collect_deleted_trips(self, db: Session) -> None:
+        for media in crud.media_file.get_orphaned(db, limit=max(self._budget, 0)):
+            if self._exhausted():
+                break
+            self._delete_media(media.file_path, "trip_media")
+            db.delete(media)
+            db.commit()
+
+        for job in crud.render_job.get_orphaned(db, limit=max(self._budget, 0)):
+            if self._exhausted():
+                break
+            if job.output_path and job.status == "completed":
+                self._delete_key(job.output_path, "trip_render", job.output_size)
+            db.delete(job)
+            db.commit()
+
+    def _in_use(self, db: Session, job: models.RenderJob) -> bool:
+        """
+        The render is the video its trip currently shows; it then counts as
+        used now, so it moves to the back of the eviction order
+        """
+        trip = job.trip
+        if trip is None or trip.generated_video_url != storage.url(job.output_path):
+            return False
+        job.last_used_at = datetime.now(timezone.utc)
+        db.commit()
+        return True
+
+    def _expire(self, db: Session, job: models.RenderJob, kind: str) -> None:
+        self._delete_key(job.output_path, kind, job.output_size)
+        job.status = "expired"
+        db.commit()
+
+    def _collect_old_renders(self, db: Session) -> None:
+        if self.retention_days > 0:
+            before = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+            for job in crud.render_job.get_least_recently_used(
+                db, before=before, limit=max(self._budget, 0)
+            ):
+                if self._exhausted():
+                    break
+                if not self._in_use(db, job):
+                    self._expire(db, job, "render_retention")
+
+        if self.render_max_bytes > 0:
+            excess = crud.render_job.get_total_output_size(db) - self.render_max_bytes
+            if excess <= 0:
+                return
+            for job in crud.render_job.get_least_recently_used(db, limit=max(self._budget, 0)):
+                if excess <= 0 or self._exhausted():
+                    break
+                if not self._in_use(db, job):
+                    excess -= job.output_size or 0
+                    self._expire(db, job, "render_lru")
+
+    def _sweep_shard(self, db: Session, shard: Optional[str]) -> None:
+        """Delete files in one shard that no media row or render refers to"""
+        if self._exhausted():
+            return
+        media_paths = crud.media_file.get_file_paths(db, shard=shard)
+        output_paths = crud.render_job.get_output_paths(db, shard=shard)
+        # Compare by URL so keys and full paths from before sharding match.
+        # Trips also point at videos rendered before render jobs existed.
+        referenced = {storage.url(path) for path in media_paths + output_paths}
+        referenced.update(crud.trip.get_video_urls(db, shard=shard))
+        media_stems = {storage.url(os.path.splitext(path)[0]) for path in media_paths}
+        cutoff_ns = (time.time() - self.grace_seconds) * 1e9
+
+        prefix = f"{shard}/" if shard is not None else ""
+        for key, size, mtime_ns in storage.iter_keys(prefix, recursive=shard is not None):
+            if self._exhausted():
+                break
+            if mtime_ns > cutoff_ns:
+                # Possibly an upload or render whose row is not committed yet
+                continue
+            if storage.url(key) in referenced:
+                continue
+            if PART_MARKER in key:
+                self._delete_key(key, "partial", size)
+            elif PROXY_MARKER in key and storage.url(key.split(PROXY_MARKER)[0]) in media_stems:
+                continue
+            else:
+                self._delete_key(key, "unreferenced", size)
+
+
+collector = MediaGarbageCollector(
+    interval=settings.GC_INTERVAL_SECONDS,
+    batch_size=settings.GC_BATCH_SIZE,
+    max_deletes_per_second=settings.GC_MAX_DELETES_PER_SECOND,
+    grace_seconds=settings.GC_GRACE_SECONDS,
+    retention_days=settings.RENDER_RETENTION_DAYS,
+    render_max_bytes=settings.RENDER_STORAGE_MAX_BYTES
+)
@@ -0,0 +1,116 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(
+            name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Minimal thread-safe registry of counters, gauges and histograms,
+    rendered in the Prometheus text exposition format
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+
+    def describe(
+        self, name: str, kind: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        """Declare a metric; kind is counter, gauge or histogram"""
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            if kind == "histogram":
+                self._buckets[name] = tuple(buckets)
+                self._histograms.setdefault(name, {})
+            else:
+                self._values.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            histogram.observe(value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(set(self._values) | set(self._histograms)):
+                kind, help_text = self._meta.get(
+                    name, ("histogram" if name in self._histograms else "untyped", "")
+                )
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}"
+                        )
+                    lines.append(
+                        f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}"
+                    )
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,201 @@
+import asyncio
+import ctypes
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Modules only renders need; an API worker that has them loaded has rendered
+RENDER_STACK_MODULES = ("cv2", "numpy", "PIL")
+
+_started_at = time.time()
+
+
+def rss_mb() -> Optional[float]:
+    """Resident set size of this process now (Linux), else its peak so far"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def process_start_time(pid: int) -> Optional[str]:
+    """Start time of process pid in clock ticks since boot (Linux), else None"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Fields after the command name, which is parenthesized and may hold spaces
+    fields = stat.rpartition(")")[2].split()
+    return fields[19] if len(fields) > 19 else None
+
+
+# Stands in for the start time where /proc is unavailable; new in each process
+_process_token = uuid.uuid4().hex[:12]
+
+
+def _new_process_token() -> None:
+    global _process_token
+    _process_token = uuid.uuid4().hex[:12]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_new_process_token)
+
+
+def worker_id() -> str:
+    """
+    Identifies this process across hosts and restarts; stored on the render
+    jobs it runs. Host and pid alone recur when a restarted container
+    reuses them, so the process start time is part of it.
+    """
+    pid = os.getpid()
+    return f"{socket.gethostname()}:{pid}:{process_start_time(pid) or _process_token}"
+
+
+def local_process_alive(worker: Optional[str]) -> Optional[bool]:
+    """
+    Whether the process of a worker_id() is still running, or None if it
+    is on another host (or unknown) and cannot be checked from here. A
+    live process with the worker's pid but another start time has reused
+    the pid; the worker is gone.
+    """
+    host, _, rest = (worker or "").partition(":")
+    pid, _, started = rest.partition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    if worker == worker_id():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # Workers recorded without a start time, or without /proc, cannot tell
+    # a reused pid apart
+    current = process_start_time(int(pid))
+    if started and current is not None:
+        return started == current
+    return True
+
+
+def render_stack_loaded() -> List[str]:
+    return [name for name in RENDER_STACK_MODULES if name in sys.modules]
+
+
+class WorkerTable:
+    """
+    One health row per server worker in shared memory. serve.py creates it
+    before forking, so any worker can report on all of them from /health.
+    """
+
+    FIELDS = ("pid", "started_at", "heartbeat_at", "rss_mb", "renders_running", "restarts")
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        # Unlocked: each field has a single writer (the worker or the supervisor)
+        self._rows = multiprocessing.RawArray(ctypes.c_double, workers * len(self.FIELDS))
+
+    def _offset(self, index: int, field: str) -> int:
+        return index * len(self.FIELDS) + self.FIELDS.index(field)
+
+    def get(self, index: int, field: str) -> float:
+        return self._rows[self._offset(index, field)]
+
+    def update(self, index: int, **values: float) -> None:
+        for field, value in values.items():
+            self._rows[self._offset(index, field)] = value
+
+    def stats(self, stale_after: float) -> Dict[str, Any]:
+        now = time.time()
+        workers = []
+        for index in range(self.workers):
+            row = {field: self.get(index, field) for field in self.FIELDS}
+            heartbeat_age = now - row["heartbeat_at"] if row["heartbeat_at"] else None
+            workers.append({
+                "index": index,
+                "pid": int(row["pid"]) or None,
+                # A worker whose event loop is blocked stops sending heartbeats
+                "healthy": heartbeat_age is not None and heartbeat_age <= stale_after,
+                "heartbeat_age_seconds": None if heartbeat_age is None else round(heartbeat_age, 1),
+                "uptime_seconds": round(now - row["started_at"]) if row["started_at"] else None,
+                "rss_mb": row["rss_mb"] or None,
+                "renders_running": int(row["renders_running"]),
+                "restarts": int(row["restarts"]),
+            })
+        return {
+            "count": self.workers,
+            "healthy": sum(1 for worker in workers if worker["healthy"]),
+            "workers": workers,
+        }
+
+
+# Set by serve.py in each worker it forks; unset under plain uvicorn
+_worker_index: Optional[int] = None
+_worker_table: Optional[WorkerTable] = None
+
+
+def set_worker(index: int, table: WorkerTable) -> None:
+    global _worker_index, _worker_table, _started_at
+    _worker_index = index
+    _worker_table = table
+    _started_at = time.time()
+
+
+def is_primary_worker() -> bool:
+    """True in worker 0 of serve.py, and in a server without workers"""
+    return _worker_index in (None, 0)
+
+
+def worker_stats() -> Optional[Dict[str, Any]]:
+    if _worker_table is None:
+        return None
+    return _worker_table.stats(stale_after=settings.SERVER_HEARTBEAT_INTERVAL * 3)
+
+
+async def report_worker_health(renders_running: Callable[[], int]) -> None:
+    """Update this worker's row in the worker table until cancelled"""
+    if _worker_table is None:
+        return
+    while True:
+        _worker_table.update(
+            _worker_index,
+            heartbeat_at=time.time(),
+            rss_mb=rss_mb() or 0,
+            renders_running=renders_running()
+        )
+        await asyncio.sleep(settings.SERVER_HEARTBEAT_INTERVAL)
+
+
+def process_stats() -> Dict[str, Any]:
+    rss = rss_mb()
+    budget = settings.API_RSS_BUDGET_MB
+    return {
+        "pid": os.getpid(),
+        "worker": _worker_index,
+        "uptime_seconds": round(time.time() - _started_at),
+        "rss_mb": rss,
+        "rss_budget_mb": budget,
+        "over_budget": bool(budget and rss is not None and rss > budget),
+        "render_stack_loaded": render_stack_loaded(),
+    }
@@ -0,0 +1,265 @@
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+LANE_PRIORITIES = {
+    "preview": 0,
+    "short": 1,
+    "standard": 2,
+}
+
+registry.describe("render_queue_depth", "gauge", "Renders waiting to start, by lane")
+registry.describe("render_running", "gauge", "Renders currently running")
+registry.describe("render_memory_planned_mb", "gauge", "Planned peak memory of the running renders")
+registry.describe(
+    "render_scheduler_decisions_total", "counter",
+    "Scheduling decisions: admitted, rejected_queue_full, rejected_user_queue, "
+    "deferred_user_cap, deferred_memory, dispatched"
+)
+registry.describe(
+    "render_queue_wait_seconds", "histogram",
+    "Time a render waited in the queue before starting, by lane"
+)
+
+
+class AdmissionError(Exception):
+    """A render was refused by admission control"""
+
+    def __init__(self, reason: str, detail: str, status_code: int):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.status_code = status_code
+
+
+class _QueuedRender:
+    def __init__(
+        self, seq: int, user_id: int, lane: str, memory_mb: float, fn: Callable, kwargs: Dict[str, Any]
+    ):
+        self.seq = seq
+        self.user_id = user_id
+        self.lane = lane
+        self.memory_mb = memory_mb
+        self.priority = LANE_PRIORITIES.get(lane, LANE_PRIORITIES["standard"])
+        self.fn = fn
+        self.kwargs = kwargs
+        self.queued_at = time.monotonic()
+        self.deferred = False
+        self.deferred_memory = False
+
+
+class RenderScheduler:
+    """
+    Runs renders on a fixed pool of worker threads.
+
+    Queued renders start in lane priority order (preview, then short trips,
+    then the rest), first come first served within a lane, but a user never
+    has more than max_per_user renders running at once: their further
+    renders wait while other users' renders go ahead. The next render also
+    waits while it would take the planned memory of the running renders
+    over memory_budget_mb (it always runs once nothing else is running).
+    New renders are refused once the queue, or one user's share of it, is
+    full.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_per_user: int,
+        max_queue: int,
+        max_queued_per_user: int,
+        memory_budget_mb: float = 0
+    ):
+        self.workers = workers
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_queued_per_user = max_queued_per_user
+        self.memory_budget_mb = memory_budget_mb
+        self._queue: List[_QueuedRender] = []
+        self._active: List[_QueuedRender] = []
+        self._running_by_user: Counter = Counter()
+        self._running = 0
+        self._memory_mb = 0.0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def check_admission(self, user_id: int) -> None:
+        """Raise AdmissionError if a new render from user_id would be refused"""
+        with self._cond:
+            self._check_admission_locked(user_id)
+
+    def _check_admission_locked(self, user_id: int) -> None:
+        if self._stopping:
+            raise AdmissionError(
+                "shutting_down", "Render service is shutting down, please retry", 503
+            )
+        if len(self._queue) >= self.max_queue:
+            registry.inc("render_scheduler_decisions_total", decision="rejected_queue_full")
+            raise AdmissionError(
+                "queue_full", "Render queue is full, please retry later", 503
+            )
+        queued_for_user = sum(1 for job in self._queue if job.user_id == user_id)
+        if queued_for_user >= self.max_queued_per_user:
+            registry.inc("render_scheduler_decisions_total", decision="rejected_user_queue")
+            raise AdmissionError(
+                "user_queue_full",
+                f"You already have {queued_for_user} videos waiting to render",
+                429
+            )
+
+    def submit(
+        self, user_id: int, lane: str, fn: Callable, *, memory_mb: float = 0.0, **kwargs
+    ) -> None:
+        """
+        Queue fn(**kwargs) to run as a render for user_id in lane, planned
+        to need memory_mb at its peak
+        """
+        with self._cond:
+            self._check_admission_locked(user_id)
+            self._ensure_workers()
+            self._queue.append(
+                _QueuedRender(next(self._seq), user_id, lane, memory_mb, fn, kwargs)
+            )
+            registry.inc("render_scheduler_decisions_total", decision="admitted")
+            self._update_gauges()
+            self._cond.notify()
+
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"render-worker-{len(self._threads)}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _pick(self) -> Optional[_QueuedRender]:
+        """
+        Best queued render whose user is under the concurrency cap, if it
+        fits in the memory budget; it is not overtaken while it waits for
+        memory, so large renders are not starved by small ones
+        """
+        best = None
+        for job in self._queue:
+            if self._running_by_user[job.user_id] >= self.max_per_user:
+                if not job.deferred:
+                    job.deferred = True
+                    registry.inc("render_scheduler_decisions_total", decision="deferred_user_cap")
+                continue
+            if best is None or (job.priority, job.seq) < (best.priority, best.seq):
+                best = job
+        if (
+            best is not None
+            and self.memory_budget_mb > 0
+            and self._running > 0
+            and self._memory_mb + best.memory_mb > self.memory_budget_mb
+        ):
+            if not best.deferred_memory:
+                best.deferred_memory = True
+                registry.inc("render_scheduler_decisions_total", decision="deferred_memory")
+            return None
+        return best
+
+    def _next(self) -> Optional[_QueuedRender]:
+        with self._cond:
+            while True:
+                if self._stopping and not self._queue:
+                    return None
+                job = self._pick()
+                if job is not None:
+                    self._queue.remove(job)
+                    self._active.append(job)
+                    self._running_by_user[job.user_id] += 1
+                    self._running += 1
+                    self._memory_mb += job.memory_mb
+                    registry.inc("render_scheduler_decisions_total", decision="dispatched")
+                    registry.observe(
+                        "render_queue_wait_seconds",
+                        time.monotonic() - job.queued_at,
+                        lane=job.lane
+                    )
+                    self._update_gauges()
+                    return job
+                self._cond.wait()
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            try:
+                job.fn(**job.kwargs)
+            except Exception:
+                logger.exception("Render task raised")
+            finally:
+                with self._cond:
+                    self._active.remove(job)
+                    self._running_by_user[job.user_id] -= 1
+                    if self._running_by_user[job.user_id] <= 0:
+                        del self._running_by_user[job.user_id]
+                    self._running -= 1
+                    self._memory_mb -= job.memory_mb
+                    self._update_gauges()
+                    self._cond.notify_all()
+
+    def _update_gauges(self) -> None:
+        depth = Counter(job.lane for job in self._queue)
+        for lane in LANE_PRIORITIES:
+            registry.set("render_queue_depth", depth.get(lane, 0), lane=lane)
+        registry.set("render_running", self._running)
+        registry.set("render_memory_planned_mb", round(self._memory_mb, 1))
+
+    def job_ids(self) -> List[int]:
+        """job_id of each render queued or running here"""
+        with self._cond:
+            return [
+                render.kwargs["job_id"]
+                for render in itertools.chain(self._queue, self._active)
+                if "job_id" in render.kwargs
+            ]
+
+    def has_job(self, job_id: int) -> bool:
+        """Whether the render submitted with job_id is queued or running here"""
+        return job_id in self.job_ids()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "memory_planned_mb": round(self._memory_mb, 1),
+                "memory_budget_mb": self.memory_budget_mb,
+                "queued": len(self._queue),
+                "queued_by_lane": dict(Counter(job.lane for job in self._queue)),
+            }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting renders, let workers finish the queue, then exit"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            thread.join(remaining)
+
+
+scheduler = RenderScheduler(
+    workers=settings.RENDER_WORKERS,
+    max_per_user=settings.RENDER_MAX_PER_USER,
+    max_queue=settings.RENDER_QUEUE_MAX,
+    max_queued_per_user=settings.RENDER_MAX_QUEUED_PER_USER,
+    memory_budget_mb=settings.RENDER_PROCESS_MEMORY_MB
+)
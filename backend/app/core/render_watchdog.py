@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.core import events
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.process_info import local_process_alive, worker_id
+from app.core.render_scheduler import scheduler
+from app.core.storage import storage
+from app.database import SessionLocal
+from app.utils.render_checkpoint import checkpoint_name, remove_stale_checkpoints
+
+logger = logging.getLogger(__name__)
+
+registry.describe("render_watchdog_actions_total", "counter", "Renders and trips recovered by the render watchdog, by action")
+
+# Jobs and trips looked at per pass
+BATCH_SIZE = 500
+
+# A trip is set processing a moment before its render job is created
+TRIP_GRACE_SECONDS = 60
+
+# A job is claimed a moment before it reaches the scheduler, and finishes
+# a moment before it leaves it
+CLAIM_GRACE_SECONDS = 60
+
+# Outcomes of the resume callback
+REQUEUED = "requeued"
+FAILED = "failed"
+DEFERRED = "deferred"
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; the database stores UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class RenderWatchdog:
+    """
+    Recovers renders whose worker died, on a background thread:
+
+    - queued or processing jobs whose worker process on this host is
+      gone, claimed by this process but unknown to its scheduler (the
+      claim predates a restart), or, for jobs of other hosts, with no
+      progress or heartbeat (report_render_heartbeats) for
+      stale_seconds, are handed to the resume callback, which requeues
+      them (they continue from their checkpoint) or marks them failed
+    - trips left processing without a queued or running render are
+      completed from their last render, or marked failed
+    - render checkpoints untouched for checkpoint_max_age_hours are deleted
+
+    A pass runs at start, so renders cut off by a restart are picked up
+    at once.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        stale_seconds: int,
+        checkpoint_dir: str,
+        checkpoint_max_age_hours: int
+    ):
+        self.interval = interval
+        self.stale_seconds = stale_seconds
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_max_age_hours = checkpoint_max_age_hours
+        self._resume: Optional[Callable[[Session, models.RenderJob], str]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_pass: Dict[str, Any] = {}
+
+    def start(self, resume: Callable[[Session, models.RenderJob], str]) -> None:
+        """
+        resume(db, job) requeues a dead job and returns REQUEUED, marks it
+        failed and returns FAILED, or returns DEFERRED to retry next pass
+        """
+        if self._thread is not None:
+            return
+        self._resume = resume
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="render-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None,
+            "last_pass": self.last_pass,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pass()
+            except Exception:
+                logger.exception("Render watchdog pass failed")
+            self._stop.wait(self.interval)
+
+    def run_pass(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self._actions: Counter = Counter()
+        db = SessionLocal()
+        try:
+            live_outputs = self._recover_jobs(db)
+            self._recover_trips(db)
+        finally:
+            db.close()
+
+        if self.checkpoint_max_age_hours > 0:
+            removed = remove_stale_checkpoints(
+                self.checkpoint_dir,
+                self.checkpoint_max_age_hours * 3600,
+                keep={checkpoint_name(path) for path in live_outputs}
+            )
+            if removed:
+                self._record("checkpoint_removed", removed)
+
+        self.last_pass = {
+            "actions": dict(self._actions),
+            "seconds": round(time.perf_counter() - started, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if self._actions:
+            logger.info(f"Render watchdog pass: {dict(self._actions)}")
+        return self.last_pass
+
+    def _record(self, action: str, count: int = 1) -> None:
+        self._actions[action] += count
+        registry.inc("render_watchdog_actions_total", count, action=action)
+
+    def _is_dead(self, job: models.RenderJob, now: datetime) -> bool:
+        last_activity = _as_utc(job.updated_at or job.created_at)
+        if job.worker == worker_id():
+            return (
+                not scheduler.has_job(job.id)
+                and now - last_activity > timedelta(seconds=CLAIM_GRACE_SECONDS)
+            )
+        alive = local_process_alive(job.worker)
+        if alive is not None:
+            return not alive
+        # Another host, or a job from before workers were recorded: only
+        # a lack of progress and heartbeats tells
+        return now - last_activity > timedelta(seconds=self.stale_seconds)
+
+    def _recover_jobs(self, db: Session) -> set:
+        """Resume dead renders; returns the output paths of the live ones"""
+        now = datetime.now(timezone.utc)
+        live_outputs = set()
+        for job in crud.render_job.get_unfinished(db, limit=BATCH_SIZE):
+            if self._stop.is_set():
+                break
+            if job.output_path:
+                live_outputs.add(job.output_path)
+            if not self._is_dead(job, now):
+                continue
+            logger.warning(
+                f"Render job {job.id} of trip {job.trip_id} was {job.status} "
+                f"on {job.worker or 'an unknown worker'}, which is gone"
+            )
+            self._record(self._resume(db, job))
+        return live_outputs
+
+    def _recover_trips(self, db: Session) -> None:
+        """Settle trips left processing by a render that no longer exists"""
+        now = datetime.now(timezone.utc)
+        for trip in crud.trip.get_by_status(db, status="processing", limit=BATCH_SIZE):
+            if now - _as_utc(trip.updated_at or trip.created_at) < timedelta(seconds=TRIP_GRACE_SECONDS):
+                continue
+            # Previews never set a trip processing
+            job = crud.render_job.get_latest_for_trip(db, trip_id=trip.id, previews=False)
+            if job is not None and job.status in ("queued", "processing"):
+                continue
+            if job is not None and job.status == "completed" and storage.exists(job.output_path):
+                update = {
+                    "status": "completed",
+                    "generated_video_url": storage.url(job.output_path)
+                }
+                action = "trip_completed"
+            else:
+                update = {"status": "failed"}
+                action = "trip_failed"
+            trip = crud.trip.update(db, db_obj=trip, obj_in=update)
+            events.publish_trip_event(
+                trip.id,
+                status=trip.status,
+                video_url=trip.generated_video_url,
+                title=trip.title
+            )
+            self._record(action)
+
+
+def _touch_jobs(job_ids: list) -> None:
+    db = SessionLocal()
+    try:
+        crud.render_job.touch(db, ids=job_ids)
+    finally:
+        db.close()
+
+
+async def report_render_heartbeats(interval: float) -> None:
+    """
+    Refresh updated_at of the renders this process holds, queued or
+    running, until cancelled. A queued render writes nothing while it
+    waits its turn; without this, watchdogs on other hosts would take it
+    for dead and run it twice.
+    """
+    while True:
+        job_ids = scheduler.job_ids()
+        if job_ids:
+            try:
+                await run_in_threadpool(_touch_jobs, job_ids)
+            except Exception:
+                logger.exception("Render heartbeat failed")
+        await asyncio.sleep(interval)
+
+
+watchdog = RenderWatchdog(
+    interval=settings.RENDER_WATCHDOG_INTERVAL,
+    stale_seconds=settings.RENDER_STALE_SECONDS,
+    checkpoint_dir=settings.RENDER_CHECKPOINT_DIR,
+    checkpoint_max_age_hours=settings.RENDER_CHECKPOINT_MAX_AGE_HOURS
+)
@@ -0,0 +1,143 @@
+import contextvars
+import heapq
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+registry.describe(
+    "http_request_duration_seconds", "histogram",
+    "Time until the response starts, by method, route and status"
+)
+registry.describe(
+    "http_request_db_queries", "histogram",
+    "SQL statements executed per request, by route",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+registry.describe(
+    "http_request_db_seconds", "histogram",
+    "Time spent in SQL per request, by route"
+)
+registry.describe("db_queries_total", "counter", "SQL statements executed")
+
+
+class RequestStats:
+    """SQL activity of one request, with its keep_statements slowest statements"""
+
+    def __init__(self, keep_statements: int):
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.keep_statements = keep_statements
+        # Min-heap of (seconds, statement): the fastest kept one is replaced first
+        self.statements: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.statements) < self.keep_statements:
+            heapq.heappush(self.statements, (seconds, statement))
+        elif self.statements and seconds > self.statements[0][0]:
+            heapq.heapreplace(self.statements, (seconds, statement))
+
+
+# Set by the middleware; sync endpoints run in the threadpool with a copy of
+# this context, so they record into the same RequestStats object
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Count and time every SQL statement run through engine"""
+
+    # The start time goes on the statement's execution context, not the
+    # pooled connection: a statement that raises never reaches
+    # after_cursor_execute, and its context is dropped with it
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started_at
+        registry.inc("db_queries_total")
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+
+def _route_template(app, scope) -> str:
+    """Route path template, so metrics are not labelled per trip id"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-route latency plus SQL query count and time for each
+    request, and logs requests slower than SLOW_REQUEST_THRESHOLD_MS
+    together with the statements they ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        keep = settings.SLOW_REQUEST_MAX_STATEMENTS if settings.SLOW_REQUEST_THRESHOLD_MS else 0
+        stats = RequestStats(keep_statements=keep)
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = {"code": 500, "elapsed": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["elapsed"] = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            elapsed = status["elapsed"]
+            if elapsed is None:
+                elapsed = time.perf_counter() - started
+            self._record(scope, status["code"], elapsed, stats)
+
+    def _record(self, scope, status_code: int, elapsed: float, stats: RequestStats) -> None:
+        route = _route_template(scope["app"], scope) if "app" in scope else "unmatched"
+        method = scope["method"]
+
+        registry.observe(
+            "http_request_duration_seconds", elapsed,
+            method=method, route=route, status=status_code
+        )
+        registry.observe("http_request_db_queries", stats.query_count, route=route)
+        registry.observe("http_request_db_seconds", stats.query_seconds, route=route)
+
+        threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold and elapsed * 1000 >= threshold:
+            slowest = sorted(stats.statements, reverse=True)
+            statements = "\n".join(
+                f"  {seconds * 1000:.1f} ms: {statement}" for seconds, statement in slowest
+            )
+            logger.warning(
+                f"Slow request {method} {route} took {elapsed * 1000:.0f} ms "
+                f"with {stats.query_count} queries ({stats.query_seconds * 1000:.0f} ms in SQL)"
+                + (f"\n{statements}" if statements else "")
+            )
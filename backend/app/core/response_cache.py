@@ -0,0 +1,117 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class ResponseCache:
+    """
+    Serialized read responses per (user, trip), tagged with the version
+    they were built from. A response is only served for the version it was
+    built from, so a stale entry is never returned even when this process
+    missed an invalidation; invalidate() frees entries as soon as a trip
+    changes. trip_id None holds the user's trip lists.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, user_id: int, trip_id: Optional[int], name: str, version: str) -> Optional[bytes]:
+        entry = self._cache.get((user_id, trip_id))
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1].get(name)
+
+    def set(self, user_id: int, trip_id: Optional[int], name: str, version: str, body: bytes) -> None:
+        key = (user_id, trip_id)
+        entry = self._cache.get(key)
+        if entry is None or entry[0] != version:
+            entry = (version, {})
+        entry[1][name] = body
+        self._cache.set(key, entry)
+
+    def invalidate(self, user_id: int, trip_id: Optional[int] = None) -> None:
+        """Drop a trip's responses (if given) and the user's trip lists"""
+        if trip_id is not None:
+            self._cache.invalidate((user_id, trip_id))
+        self._cache.invalidate((user_id, None))
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+response_cache = ResponseCache(
+    max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite and MySQL hand back naive datetimes; the server stores UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(*parts: Hashable) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def cached_json_response(
+    request: Request,
+    *,
+    user_id: int,
+    trip_id: Optional[int],
+    name: str,
+    version: str,
+    last_modified: Optional[datetime],
+    build: Callable[[], Any]
+) -> Response:
+    """
+    Answer a read with 304 when the client already has this version,
+    else with the cached body, building and caching it on a miss.
+    build() returns the data to serialize and is only called on a miss.
+    """
+    etag = make_etag(name, version)
+    headers = {
+        "ETag": etag,
+        # Private data: clients may keep it but must revalidate
+        "Cache-Control": "private, no-cache",
+    }
+    if last_modified is not None:
+        last_modified = _as_utc(last_modified)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(user_id, trip_id, name, version)
+    if body is None:
+        body = json.dumps(jsonable_encoder(build())).encode()
+        response_cache.set(user_id, trip_id, name, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,10 +1,27 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
-from jose import jwt
+import time
+from typing import Any, Optional, Union
+from jose import jwt, JWTError
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt is pure CPU; run it in a small dedicated pool instead of the API worker
+_hash_executor: Optional[ProcessPoolExecutor] = None
+
+# Verified token -> subject, so each JWT is decoded once per process
+token_cache = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
@@ -19,8 +36,50 @@ def create_access_token(
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def verify_access_token(token: str) -> Optional[str]:
+    """Return the token subject, or None if the token is invalid or expired"""
+    subject = token_cache.get(token)
+    if subject is not None:
+        return subject
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+    subject = payload.get("sub")
+    if subject is None:
+        return None
+
+    # Never keep a token cached past its own expiry
+    ttl = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(token, subject, ttl=ttl)
+    return subject
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_executor
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_hash_executor(), verify_password, plain_password, hashed_password
+    )
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), get_password_hash, password)
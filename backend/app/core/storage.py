@@ -0,0 +1,333 @@
+import hashlib
+import logging
+import os
+import shutil
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import timezone
+from typing import BinaryIO, ContextManager, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes per read when streaming files in and out of storage
+CHUNK_SIZE = 1024 * 1024
+
+
+def _part_path(path: str) -> str:
+    """Temporary name for a file being written; keeps the extension for OpenCV"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.part{ext}"
+
+
+class Storage(ABC):
+    """
+    Where uploads, clip proxies and rendered videos live
+
+    Files are addressed by keys: '/'-separated names relative to the store,
+    e.g. '3f/a2/<uuid>.jpg'. OpenCV and PIL need real files, so renders go
+    through local_path() and writable_path(), which are free for local disk
+    and download / upload for remote stores.
+    """
+
+    def __init__(self, shard_depth: int = 2):
+        self.shard_depth = shard_depth
+
+    def shard_key(self, filename: str) -> str:
+        """Key for a new file, spread over hash-prefix directories"""
+        digest = hashlib.sha1(filename.encode()).hexdigest()
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return "/".join(shards + [filename])
+
+    def url(self, key: str) -> str:
+        """Public URL of a key; served from /uploads for every backend"""
+        return f"/uploads/{key}"
+
+    @abstractmethod
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        """Store the content of fileobj under key"""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open key for binary reading"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether key exists"""
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[Tuple[int, int]]:
+        """(size in bytes, mtime in ns), or None if the key does not exist"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete a key; missing keys are ignored"""
+
+    @abstractmethod
+    def list(self, prefix: str) -> List[str]:
+        """Keys starting with prefix"""
+
+    @abstractmethod
+    def iter_keys(self, prefix: str = "", recursive: bool = True) -> Iterator[Tuple[str, int, int]]:
+        """
+        (key, size, mtime in ns) of the files under the directory prefix
+        ('' or e.g. '3f/'), in subdirectories too if recursive
+        """
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with self.open(key) as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    @abstractmethod
+    def local_path(self, key: str) -> ContextManager[str]:
+        """A context manager giving a local file with the content of key, for reading"""
+
+    @abstractmethod
+    def writable_path(self, key: str) -> ContextManager[str]:
+        """
+        A context manager giving a local path to write key to. The file is
+        published under key when the block exits without an exception and
+        the file was created.
+        """
+
+
+class LocalStorage(Storage):
+    """Files under a local directory, sharded by hash prefix"""
+
+    def __init__(self, root: str, shard_depth: int = 2):
+        super().__init__(shard_depth)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        # Rows written before sharding store the full path
+        # ('uploads/<uuid>.jpg'), which is used as is
+        normalized = os.path.normpath(key)
+        root = os.path.normpath(self.root)
+        if os.path.isabs(key) or normalized == root or normalized.startswith(root + os.sep):
+            return key
+        return os.path.join(self.root, *key.split("/"))
+
+    def url(self, key: str) -> str:
+        relative = os.path.relpath(self.path(key), self.root)
+        if relative.startswith(os.pardir):
+            relative = os.path.basename(key)
+        return super().url(relative.replace(os.sep, "/"))
+
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        with self.writable_path(key) as path:
+            with open(path, "wb") as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def stat(self, key: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path(key))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> List[str]:
+        key_dir, name_prefix = prefix.rpartition("/")[0], prefix.rpartition("/")[2]
+        directory = self.path(key_dir) if key_dir else self.root
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return [
+            f"{key_dir}/{name}" if key_dir else name
+            for name in sorted(names)
+            if name.startswith(name_prefix) and not os.path.isdir(os.path.join(directory, name))
+        ]
+
+    def iter_keys(self, prefix: str = "", recursive: bool = True) -> Iterator[Tuple[str, int, int]]:
+        directory = self.path(prefix.rstrip("/")) if prefix else self.root
+        for dirpath, dirnames, filenames in os.walk(directory):
+            # Hidden directories (.cache) are not stored files
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(".")) if recursive else []
+            relative = os.path.relpath(dirpath, self.root)
+            for name in sorted(filenames):
+                if name.startswith("."):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                key = name if relative == os.curdir else f"{relative.replace(os.sep, '/')}/{name}"
+                yield key, st.st_size, st.st_mtime_ns
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        yield self.path(key)
+
+    @contextmanager
+    def writable_path(self, key: str) -> Iterator[str]:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = _part_path(path)
+        try:
+            yield temp_path
+            if os.path.exists(temp_path):
+                # Readers only ever see complete files
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+class S3Storage(Storage):
+    """
+    Files in an S3-compatible bucket (AWS, MinIO, or a local stand-in such
+    as moto's server via S3_ENDPOINT_URL). Reads for rendering are cached
+    under cache_dir; keys are never rewritten, so cached copies stay valid.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        cache_dir: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        shard_depth: int = 2
+    ):
+        super().__init__(shard_depth)
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+        self._client_error = ClientError
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _object(self, key: str) -> str:
+        return self.prefix + key
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, *key.split("/"))
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        self.client.upload_fileobj(fileobj, self.bucket, self._object(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object(key))["Body"]
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def stat(self, key: str) -> Optional[Tuple[int, int]]:
+        head = self._head(key)
+        if head is None:
+            return None
+        modified = head["LastModified"].astimezone(timezone.utc)
+        return head["ContentLength"], int(modified.timestamp() * 1e9)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+        try:
+            os.remove(self._cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> List[str]:
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object(prefix)):
+            for item in page.get("Contents", []):
+                keys.append(item["Key"][len(self.prefix):])
+        return keys
+
+    def iter_keys(self, prefix: str = "", recursive: bool = True) -> Iterator[Tuple[str, int, int]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=self._object(prefix),
+            **({} if recursive else {"Delimiter": "/"})
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                modified = item["LastModified"].astimezone(timezone.utc)
+                yield item["Key"][len(self.prefix):], item["Size"], int(modified.timestamp() * 1e9)
+
+    @contextmanager
+    def local_path(self, key: str) -> Iterator[str]:
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = _part_path(path)
+            try:
+                self.client.download_file(self.bucket, self._object(key), temp_path)
+                os.replace(temp_path, path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        yield path
+
+    @contextmanager
+    def writable_path(self, key: str) -> Iterator[str]:
+        path = self._cache_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = _part_path(path)
+        try:
+            yield temp_path
+            if os.path.exists(temp_path):
+                self.client.upload_file(temp_path, self.bucket, self._object(key))
+                # Keep the written file as the cached copy
+                os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _create_storage() -> Storage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            cache_dir=settings.STORAGE_CACHE_DIR,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            shard_depth=settings.STORAGE_SHARD_DEPTH
+        )
+    return LocalStorage(settings.UPLOAD_DIR, shard_depth=settings.STORAGE_SHARD_DEPTH)
+
+
+storage = _create_storage()
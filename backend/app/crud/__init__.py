@@ -1,5 +1,6 @@
 from .user import user
 from .trip import trip
 from .media import media_file
+from .render_job import render_job
 
-__all__ = ["user", "trip", "media_file"]
\ No newline at end of file
+__all__ = ["user", "trip", "media_file", "render_job"]
\ No newline at end of file
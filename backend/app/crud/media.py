@@ -1,7 +1,9 @@
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
+from app.crud.trip import trip as crud_trip
 from app.models.media import MediaFile
+from app.models.trip import Trip
 from app.schemas.media import MediaFileCreate, MediaFileUpdate
 
 class CRUDMediaFile(CRUDBase[MediaFile, MediaFileCreate, MediaFileUpdate]):
@@ -15,8 +17,82 @@ class CRUDMediaFile(CRUDBase[MediaFile, MediaFileCreate, MediaFileUpdate]):
     ) -> MediaFile:
         db_obj = self.model(**obj_in.dict())
         db.add(db_obj)
+        crud_trip.bump_media_version(db, trip_ids=[obj_in.trip_id])
         db.commit()
         db.refresh(db_obj)
+        crud_trip.invalidate_media(db, trip_ids=[obj_in.trip_id])
         return db_obj
+    
+    def create_multi_with_trip(
+        self, db: Session, *, objs_in: List[MediaFileCreate]
+    ) -> List[MediaFile]:
+        """Insert several media rows in one transaction"""
+        db_objs = [self.model(**obj_in.dict()) for obj_in in objs_in]
+        trip_ids = list({obj_in.trip_id for obj_in in objs_in})
+        db.add_all(db_objs)
+        crud_trip.bump_media_version(db, trip_ids=trip_ids)
+        db.flush()
+        ids = [db_obj.id for db_obj in db_objs]
+        db.commit()
+        # Reload the expired rows with one query rather than one per row
+        db.query(self.model).filter(MediaFile.id.in_(ids)).all()
+        crud_trip.invalidate_media(db, trip_ids=trip_ids)
+        return db_objs
+    
+    def remove(self, db: Session, *, id: int) -> MediaFile:
+        obj = db.query(self.model).get(id)
+        db.delete(obj)
+        crud_trip.bump_media_version(db, trip_ids=[obj.trip_id])
+        db.commit()
+        crud_trip.invalidate_media(db, trip_ids=[obj.trip_id])
+        return obj
+    
+    def get_multi_for_owner(
+        self, db: Session, *, ids: List[int], owner_id: int
+    ) -> List[MediaFile]:
+        return (
+            db.query(self.model)
+            .join(Trip, MediaFile.trip_id == Trip.id)
+            .filter(MediaFile.id.in_(ids), Trip.owner_id == owner_id)
+            .all()
+        )
+    
+    def remove_multi(self, db: Session, *, ids: List[int]) -> int:
+        """Delete media rows in one statement; returns how many were deleted"""
+        trip_ids = [
+            trip_id for (trip_id,) in
+            db.query(MediaFile.trip_id).filter(MediaFile.id.in_(ids)).distinct()
+        ]
+        count = (
+            db.query(self.model)
+            .filter(MediaFile.id.in_(ids))
+            .delete(synchronize_session=False)
+        )
+        crud_trip.bump_media_version(db, trip_ids=trip_ids)
+        db.commit()
+        crud_trip.invalidate_media(db, trip_ids=trip_ids)
+        return count
+    
+    def get_orphaned(self, db: Session, *, limit: int) -> List[MediaFile]:
+        """Media whose trip has been deleted"""
+        return (
+            db.query(self.model)
+            .outerjoin(Trip, MediaFile.trip_id == Trip.id)
+            .filter(Trip.id.is_(None))
+            .limit(limit)
+            .all()
+        )
+    
+    def get_file_paths(self, db: Session, *, shard: Optional[str]) -> List[str]:
+        """
+        Storage keys of media in one top-level storage shard, or with
+        shard=None those stored before sharding
+        """
+        query = db.query(MediaFile.file_path)
+        if shard is None:
+            query = query.filter(~MediaFile.file_path.like("__/%"))
+        else:
+            query = query.filter(MediaFile.file_path.like(f"{shard}/%"))
+        return [path for (path,) in query.all()]
 
 media_file = CRUDMediaFile(MediaFile)
\ No newline at end of file
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models.render_job import RenderJob
+from app.models.trip import Trip
+from app.schemas.render_job import RenderJobCreate, RenderJobUpdate
+
+class CRUDRenderJob(CRUDBase[RenderJob, RenderJobCreate, RenderJobUpdate]):
+    def get_latest_for_trip(
+        self, db: Session, *, trip_id: int, previews: bool = True
+    ) -> Optional[RenderJob]:
+        """Latest render of a trip; with previews=False, its latest full-quality render"""
+        query = db.query(self.model).filter(RenderJob.trip_id == trip_id)
+        if not previews:
+            query = query.filter(or_(RenderJob.lane.is_(None), RenderJob.lane != "preview"))
+        return query.order_by(RenderJob.id.desc()).first()
+
+    def get_by_fingerprint(
+        self, db: Session, *, fingerprint: str, statuses: List[str]
+    ) -> Optional[RenderJob]:
+        return (
+            db.query(self.model)
+            .filter(RenderJob.fingerprint == fingerprint, RenderJob.status.in_(statuses))
+            .order_by(RenderJob.id.desc())
+            .first()
+        )
+
+    def get_unfinished(self, db: Session, *, limit: int) -> List[RenderJob]:
+        """Renders queued or processing, oldest first"""
+        return (
+            db.query(self.model)
+            .filter(RenderJob.status.in_(["queued", "processing"]))
+            .order_by(RenderJob.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+    def touch(self, db: Session, *, ids: List[int]) -> None:
+        """Mark unfinished renders as alive, changing nothing else"""
+        (
+            db.query(self.model)
+            .filter(RenderJob.id.in_(ids), RenderJob.status.in_(["queued", "processing"]))
+            .update({RenderJob.updated_at: datetime.now(timezone.utc)}, synchronize_session=False)
+        )
+        db.commit()
+
+    def get_orphaned(self, db: Session, *, limit: int) -> List[RenderJob]:
+        """Render jobs whose trip has been deleted"""
+        return (
+            db.query(self.model)
+            .outerjoin(Trip, RenderJob.trip_id == Trip.id)
+            .filter(Trip.id.is_(None))
+            .limit(limit)
+            .all()
+        )
+
+    def get_least_recently_used(
+        self, db: Session, *, before: Optional[datetime] = None, limit: int
+    ) -> List[RenderJob]:
+        """Completed renders, least recently used first, optionally only those unused since before"""
+        last_used = func.coalesce(RenderJob.last_used_at, RenderJob.finished_at)
+        query = db.query(self.model).filter(RenderJob.status == "completed")
+        if before is not None:
+            query = query.filter(last_used < before)
+        return query.order_by(last_used.asc(), RenderJob.id.asc()).limit(limit).all()
+
+    def get_total_output_size(self, db: Session) -> int:
+        total = (
+            db.query(func.sum(RenderJob.output_size))
+            .filter(RenderJob.status == "completed")
+            .scalar()
+        )
+        return int(total or 0)
+
+    def get_output_paths(self, db: Session, *, shard: Optional[str]) -> List[str]:
+        """
+        Storage keys of renders that may still be used, in one top-level
+        storage shard, or with shard=None those stored before sharding
+        """
+        query = db.query(RenderJob.output_path).filter(
+            RenderJob.output_path.isnot(None), RenderJob.status != "expired"
+        )
+        if shard is None:
+            query = query.filter(~RenderJob.output_path.like("__/%"))
+        else:
+            query = query.filter(RenderJob.output_path.like(f"{shard}/%"))
+        return [path for (path,) in query.all()]
+
+render_job = CRUDRenderJob(RenderJob)
@@ -1,6 +1,10 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.response_cache import response_cache
 from app.crud.base import CRUDBase
+from app.models.media import MediaFile
+from app.models.render_job import RenderJob
 from app.models.trip import Trip
 from app.schemas.trip import TripCreate, TripUpdate
 
@@ -16,6 +20,30 @@ class CRUDTrip(CRUDBase[Trip, TripCreate, TripUpdate]):
             .all()
         )
     
+    def get_by_status(
+        self, db: Session, *, status: str, limit: int = 100
+    ) -> List[Trip]:
+        return (
+            db.query(self.model)
+            .filter(Trip.status == status)
+            .order_by(Trip.id.asc())
+            .limit(limit)
+            .all()
+        )
+    
+    def get_video_urls(self, db: Session, *, shard: Optional[str]) -> List[str]:
+        """
+        Video URLs trips point to in one top-level storage shard, or with
+        shard=None those stored before sharding (e.g. trip_<id>_<style>.mp4
+        renders, which have no render job)
+        """
+        query = db.query(Trip.generated_video_url).filter(Trip.generated_video_url.isnot(None))
+        if shard is None:
+            query = query.filter(~Trip.generated_video_url.like("/uploads/__/%"))
+        else:
+            query = query.filter(Trip.generated_video_url.like(f"/uploads/{shard}/%"))
+        return [url for (url,) in query.all()]
+    
     def create_with_owner(
         self, db: Session, *, obj_in: TripCreate, owner_id: int
     ) -> Trip:
@@ -24,6 +52,70 @@ class CRUDTrip(CRUDBase[Trip, TripCreate, TripUpdate]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        response_cache.invalidate(owner_id)
+        return db_obj
+    
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Trip,
+        obj_in: Union[TripUpdate, Dict[str, Any]]
+    ) -> Trip:
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        response_cache.invalidate(db_obj.owner_id, db_obj.id)
         return db_obj
+    
+    def bump_media_version(self, db: Session, *, trip_ids: List[int]) -> None:
+        """
+        Mark trips' media as changed, in the caller's transaction; the
+        caller commits and then calls invalidate_media
+        """
+        if not trip_ids:
+            return
+        db.query(Trip).filter(Trip.id.in_(trip_ids)).update(
+            {Trip.media_version: Trip.media_version + 1, Trip.updated_at: func.now()},
+            synchronize_session=False
+        )
+    
+    def invalidate_media(self, db: Session, *, trip_ids: List[int]) -> None:
+        for trip_id, owner_id in db.query(Trip.id, Trip.owner_id).filter(Trip.id.in_(trip_ids)):
+            response_cache.invalidate(owner_id, trip_id)
+    
+    def get_version(self, trip: Trip) -> str:
+        """
+        Changes whenever the trip or its media change. Built from every
+        column, since updated_at alone has only second precision on most
+        databases.
+        """
+        return repr([getattr(trip, column.key) for column in Trip.__table__.columns])
+    
+    def remove_with_media(
+        self, db: Session, *, id: int
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Delete a trip with its media and render jobs in one transaction,
+        one statement per table. Returns the storage keys of its media and
+        of its rendered videos, for the caller to delete.
+        """
+        media_keys = [
+            path for (path,) in
+            db.query(MediaFile.file_path).filter(MediaFile.trip_id == id).all()
+        ]
+        output_keys = [
+            path for (path,) in
+            db.query(RenderJob.output_path)
+            .filter(RenderJob.trip_id == id, RenderJob.status == "completed")
+            .all()
+            if path
+        ]
+        owner_id = db.query(Trip.owner_id).filter(Trip.id == id).scalar()
+        db.query(MediaFile).filter(MediaFile.trip_id == id).delete(synchronize_session=False)
+        db.query(RenderJob).filter(RenderJob.trip_id == id).delete(synchronize_session=False)
+        db.query(Trip).filter(Trip.id == id).delete(synchronize_session=False)
+        db.commit()
+        if owner_id is not None:
+            response_cache.invalidate(owner_id, id)
+        return media_keys, output_keys
 
 trip = CRUDTrip(Trip)
\ No newline at end of file
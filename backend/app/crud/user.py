@@ -1,11 +1,46 @@
-from typing import Optional
+from typing import Any, Dict, Optional, Union
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    def __init__(self, model):
+        super().__init__(model)
+        # Resolved users keyed by token subject (the user id as a string)
+        self.cache = TTLCache(
+            max_size=settings.USER_CACHE_MAX_SIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS
+        )
+    
+    def get_cached(self, db: Session, *, subject: str) -> Optional[User]:
+        """
+        Resolve a user by token subject, reusing a detached copy for a short
+        TTL so authenticated requests skip the users query.
+        """
+        user = self.cache.get(subject)
+        if user is not None:
+            return user
+        
+        user = self.get(db, id=int(subject))
+        if user:
+            # Column attributes stay loaded; the instance is read-only from here
+            db.expunge(user)
+            self.cache.set(subject, user)
+        return user
+    
+    def invalidate(self, user_id: int) -> None:
+        self.cache.invalidate(str(user_id))
+    
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
     
@@ -19,11 +54,45 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             hashed_password=get_password_hash(obj_in.password),
             full_name=obj_in.full_name,
         )
+        return self._insert(db, db_obj)
+    
+    async def create_async(self, db: Session, *, obj_in: UserCreate) -> User:
+        """
+        Same as create, with the password hashed off the event loop and
+        the insert run in the thread pool
+        """
+        db_obj = User(
+            email=obj_in.email,
+            username=obj_in.username,
+            hashed_password=await get_password_hash_async(obj_in.password),
+            full_name=obj_in.full_name,
+        )
+        return await run_in_threadpool(self._insert, db, db_obj)
+    
+    def _insert(self, db: Session, db_obj: User) -> User:
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
         return db_obj
     
+    def update(
+        self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        if isinstance(obj_in, dict):
+            update_data = dict(obj_in)
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if update_data.get("password"):
+            update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        self.invalidate(db_obj.id)
+        return db_obj
+    
+    def remove(self, db: Session, *, id: int) -> User:
+        obj = super().remove(db, id=id)
+        self.invalidate(id)
+        return obj
+    
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
         if not user:
@@ -32,6 +101,20 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
     
+    async def authenticate_async(
+        self, db: Session, *, email: str, password: str
+    ) -> Optional[User]:
+        """
+        Same as authenticate, with the lookup in the thread pool and bcrypt
+        verification off the event loop
+        """
+        user = await run_in_threadpool(self.get_by_email, db, email=email)
+        if not user:
+            return None
+        if not await verify_password_async(password, user.hashed_password):
+            return None
+        return user
+    
     def is_active(self, user: User) -> bool:
         return user.is_active
 
@@ -1,5 +1,6 @@
 from .user import User
 from .trip import Trip
 from .media import MediaFile
+from .render_job import RenderJob
 
-__all__ = ["User", "Trip", "MediaFile"]
\ No newline at end of file
+__all__ = ["User", "Trip", "MediaFile", "RenderJob"]
\ No newline at end of file
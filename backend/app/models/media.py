@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, BigInteger
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -13,7 +13,12 @@ class MediaFile(Base):
     file_size = Column(BigInteger, nullable=False)
     mime_type = Column(String(100), nullable=False)
     file_type = Column(String(20), nullable=False)  # image, video
-    trip_id = Column(Integer, ForeignKey("trips.id"))
+    # From the file headers at upload; None for files uploaded before that
+    width = Column(Integer)
+    height = Column(Integer)
+    duration = Column(Float)  # seconds, videos only
+    frame_rate = Column(Float)  # videos only
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"))
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, BigInteger
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class RenderJob(Base):
+    __tablename__ = "render_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id", ondelete="CASCADE"), index=True)
+    style = Column(String(100), nullable=True)
+    fingerprint = Column(String(64), index=True, nullable=True)  # Hash of the render inputs
+    output_path = Column(String(500), nullable=True)
+    output_size = Column(BigInteger, nullable=True)  # Bytes, once completed
+    status = Column(String(50), default="queued")  # queued, processing, completed, failed, expired
+    lane = Column(String(20), nullable=True)  # Scheduler lane: preview, short, standard
+    stage = Column(String(50), nullable=True)  # intro, media, done
+    media_index = Column(Integer, default=0)
+    media_total = Column(Integer, default=0)
+    frames_written = Column(Integer, default=0)
+    fps = Column(Float, nullable=True)  # Frames written per second
+    eta_seconds = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+    metrics = Column(Text, nullable=True)  # JSON per-stage timings from the render
+    plan = Column(Text, nullable=True)  # JSON estimate made before queueing: strategy, frames, time, memory
+    worker = Column(String(100), nullable=True)  # host:pid of the process that queued or runs it
+    attempts = Column(Integer, default=1)  # Times queued; the watchdog requeues renders whose worker died
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)  # Completed or reused; for LRU eviction
+    
+    # Relationships
+    trip = relationship("Trip", back_populates="render_jobs")
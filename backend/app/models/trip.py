@@ -13,6 +13,7 @@ class Trip(Base):
     prompt = Column(Text, nullable=True)
     style = Column(String(100), nullable=True)
     generated_video_url = Column(String(500), nullable=True)
+    media_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped when media is added or removed
     status = Column(String(50), default="draft")  # draft, processing, completed, failed
     owner_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -20,4 +21,10 @@ class Trip(Base):
     
     # Relationships
     owner = relationship("User", back_populates="trips")
-    media_files = relationship("MediaFile", back_populates="trip")
\ No newline at end of file
+    # Children are removed by the database (ON DELETE CASCADE), not loaded first
+    media_files = relationship(
+        "MediaFile", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True
+    )
+    render_jobs = relationship(
+        "RenderJob", back_populates="trip", cascade="all, delete-orphan", passive_deletes=True
+    )
\ No newline at end of file
@@ -1,9 +1,11 @@
 from .user import User, UserCreate, UserUpdate, UserInDB, Token, TokenPayload
 from .trip import Trip, TripCreate, TripUpdate, TripInDB
-from .media import MediaFile, MediaFileCreate, MediaFileUpdate
+from .media import MediaFile, MediaFileCreate, MediaFileUpdate, MediaFileBulkDelete
+from .render_job import RenderJob, RenderJobCreate, RenderJobUpdate
 
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserInDB", "Token", "TokenPayload",
     "Trip", "TripCreate", "TripUpdate", "TripInDB", 
-    "MediaFile", "MediaFileCreate", "MediaFileUpdate"
+    "MediaFile", "MediaFileCreate", "MediaFileUpdate", "MediaFileBulkDelete",
+    "RenderJob", "RenderJobCreate", "RenderJobUpdate"
 ]
\ No newline at end of file
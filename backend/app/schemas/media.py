@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class MediaFileBase(BaseModel):
     filename: str
@@ -8,6 +8,10 @@ class MediaFileBase(BaseModel):
     file_size: int
     mime_type: str
     file_type: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    duration: Optional[float] = None
+    frame_rate: Optional[float] = None
 
 class MediaFileCreate(MediaFileBase):
     file_path: str
@@ -16,6 +20,9 @@ class MediaFileCreate(MediaFileBase):
 class MediaFileUpdate(BaseModel):
     filename: Optional[str] = None
 
+class MediaFileBulkDelete(BaseModel):
+    file_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
 class MediaFileInDBBase(MediaFileBase):
     id: int
     file_path: str
@@ -0,0 +1,60 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class RenderJobBase(BaseModel):
+    trip_id: int
+    style: Optional[str] = None
+
+class RenderJobCreate(RenderJobBase):
+    media_total: int = 0
+    lane: Optional[str] = None
+    fingerprint: Optional[str] = None
+    output_path: Optional[str] = None
+    plan: Optional[str] = None
+    worker: Optional[str] = None
+
+class RenderJobUpdate(BaseModel):
+    status: Optional[str] = None
+    stage: Optional[str] = None
+    media_index: Optional[int] = None
+    media_total: Optional[int] = None
+    frames_written: Optional[int] = None
+    fps: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    metrics: Optional[str] = None
+    output_size: Optional[int] = None
+    finished_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    worker: Optional[str] = None
+    attempts: Optional[int] = None
+
+class RenderJobInDBBase(RenderJobBase):
+    id: int
+    lane: Optional[str] = None
+    fingerprint: Optional[str] = None
+    output_path: Optional[str] = None
+    output_size: Optional[int] = None
+    status: str
+    stage: Optional[str] = None
+    media_index: int
+    media_total: int
+    frames_written: int
+    fps: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    metrics: Optional[str] = None
+    plan: Optional[str] = None
+    worker: Optional[str] = None
+    attempts: int = 1
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class RenderJob(RenderJobInDBBase):
+    pass
@@ -0,0 +1,256 @@
+import struct
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+# Bytes read from the start of every file; covers the PNG, GIF and AVI headers
+HEAD_SIZE = 96
+
+# Largest moov box read into memory; real ones are a few hundred KB
+MAX_MOOV_SIZE = 32 * 1024 * 1024
+
+# JPEG start-of-frame markers, which carry the picture size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# First box types of ISO media files (MP4, QuickTime)
+ISO_BOX_TYPES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+
+# ftyp brands of still-image formats in an ISO media container
+ISO_IMAGE_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"mif1", b"msf1", b"avif", b"avis"}
+
+
+class ProbeError(ValueError):
+    """The file is not a supported image or video, or is damaged"""
+
+
+class MediaInfo:
+    """What the headers of a media file say, without decoding it"""
+
+    def __init__(
+        self,
+        kind: str,
+        format: str,
+        width: int,
+        height: int,
+        duration: Optional[float] = None,
+        frame_rate: Optional[float] = None
+    ):
+        self.kind = kind  # image, video
+        self.format = format
+        self.width = width
+        self.height = height
+        self.duration = duration  # seconds
+        self.frame_rate = frame_rate
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "duration": self.duration,
+            "frame_rate": self.frame_rate,
+        }
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+def probe(f: BinaryIO) -> MediaInfo:
+    """
+    Identify a file by its magic bytes and read its picture size (and for
+    videos duration and frame rate) from the headers only, without
+    decoding. Raises ProbeError for unknown, unsupported or visibly
+    damaged files. Leaves f at position 0.
+    """
+    try:
+        f.seek(0, 2)
+        size = f.tell()
+        head = _read_at(f, 0, HEAD_SIZE)
+        if head.startswith(b"\xff\xd8\xff"):
+            info = _probe_jpeg(f)
+        elif head.startswith(b"\x89PNG\r\n\x1a\n"):
+            info = _probe_png(f, head, size)
+        elif head[:6] in (b"GIF87a", b"GIF89a"):
+            info = _probe_gif(f, head, size)
+        elif head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+            info = _probe_avi(head, size)
+        elif head[4:8] in ISO_BOX_TYPES:
+            info = _probe_iso(f, size)
+        else:
+            raise ProbeError("Unrecognized file format")
+    except (struct.error, IndexError) as e:
+        raise ProbeError("File headers are damaged") from e
+    finally:
+        f.seek(0)
+
+    if info.width <= 0 or info.height <= 0:
+        raise ProbeError("File has no picture size")
+    return info
+
+
+def _probe_jpeg(f: BinaryIO) -> MediaInfo:
+    # Walk the segments up to the frame header, skipping EXIF and thumbnails
+    offset = 2
+    while True:
+        marker = _read_at(f, offset, 4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            raise ProbeError("JPEG is truncated or damaged")
+        code = marker[1]
+        if code == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            offset += 2
+            continue
+        if code in (0xD9, 0xDA):
+            raise ProbeError("JPEG has no frame header")
+        if code in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", _read_at(f, offset + 5, 4))
+            return MediaInfo("image", "jpeg", width, height)
+        offset += 2 + struct.unpack(">H", marker[2:4])[0]
+
+
+def _probe_png(f: BinaryIO, head: bytes, size: int) -> MediaInfo:
+    if head[12:16] != b"IHDR":
+        raise ProbeError("PNG has no header chunk")
+    width, height = struct.unpack(">II", head[16:24])
+    # A complete PNG ends with an IEND chunk; OpenCV cannot read one without it
+    if _read_at(f, size - 8, 4) != b"IEND":
+        raise ProbeError("PNG is truncated")
+    return MediaInfo("image", "png", width, height)
+
+
+def _probe_gif(f: BinaryIO, head: bytes, size: int) -> MediaInfo:
+    width, height = struct.unpack("<HH", head[6:10])
+    if _read_at(f, size - 1, 1) != b"\x3b":
+        raise ProbeError("GIF is truncated")
+    return MediaInfo("image", "gif", width, height)
+
+
+def _probe_avi(head: bytes, size: int) -> MediaInfo:
+    if head[12:16] != b"LIST" or head[20:24] != b"hdrl" or head[24:28] != b"avih":
+        raise ProbeError("AVI has no main header")
+    riff_size = struct.unpack("<I", head[4:8])[0]
+    if riff_size + 8 > size:
+        raise ProbeError("AVI is truncated")
+    # avih: microseconds per frame, ..., total frames, ..., width, height
+    usec_per_frame, _, _, _, total_frames, _, _, _, width, height = struct.unpack(
+        "<10I", head[32:72]
+    )
+    frame_rate = 1e6 / usec_per_frame if usec_per_frame else None
+    duration = total_frames / frame_rate if frame_rate and total_frames else None
+    return MediaInfo("video", "avi", width, height, duration, frame_rate)
+
+
+def _boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, payload end) of the boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header or offset + box_size > end:
+            raise ProbeError("Video metadata is damaged")
+        yield box_type, offset + header, offset + box_size
+        offset += box_size
+
+
+def _child(data: bytes, start: int, end: int, box_type: bytes) -> Optional[Tuple[int, int]]:
+    for child_type, child_start, child_end in _boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+
+def _find_moov(f: BinaryIO, size: int) -> Tuple[bytes, Optional[bytes]]:
+    """
+    Read the moov box by hopping over the top-level box headers; it may
+    sit after the media data. Returns (moov, major brand).
+    """
+    offset = 0
+    brand = None
+    moov = None
+    while offset + 8 <= size:
+        header = _read_at(f, offset, 16)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header_size:
+            raise ProbeError("Video container is damaged")
+        if offset + box_size > size:
+            raise ProbeError("Video is truncated")
+        if box_type == b"ftyp":
+            brand = _read_at(f, offset + header_size, 4)
+        elif box_type == b"moov":
+            if box_size > MAX_MOOV_SIZE:
+                raise ProbeError("Video metadata is too large")
+            moov = _read_at(f, offset + header_size, box_size - header_size)
+        offset += box_size
+    if brand in ISO_IMAGE_BRANDS:
+        raise ProbeError("HEIF/AVIF images are not supported")
+    if moov is None:
+        raise ProbeError("Video has no metadata (moov) box")
+    return moov, brand
+
+
+def _probe_iso(f: BinaryIO, size: int) -> MediaInfo:
+    moov, brand = _find_moov(f, size)
+    video_format = "mov" if brand in (None, b"qt  ") else "mp4"
+
+    for box_type, trak_start, trak_end in _boxes(moov):
+        if box_type != b"trak":
+            continue
+        mdia = _child(moov, trak_start, trak_end, b"mdia")
+        if mdia is None:
+            continue
+        hdlr = _child(moov, *mdia, b"hdlr")
+        if hdlr is None or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+
+        # Media header: time scale and duration of this track
+        mdhd = _child(moov, *mdia, b"mdhd")
+        if mdhd is None:
+            raise ProbeError("Video track has no media header")
+        p = mdhd[0]
+        if moov[p] == 1:
+            timescale, duration_units = struct.unpack(">IQ", moov[p + 20:p + 32])
+        else:
+            timescale, duration_units = struct.unpack(">II", moov[p + 12:p + 20])
+        duration = duration_units / timescale if timescale else None
+
+        width = height = 0
+        frames = None
+        stbl = None
+        minf = _child(moov, *mdia, b"minf")
+        if minf is not None:
+            stbl = _child(moov, *minf, b"stbl")
+        if stbl is not None:
+            # Coded size from the first visual sample entry
+            stsd = _child(moov, *stbl, b"stsd")
+            if stsd is not None:
+                entry = stsd[0] + 8
+                width, height = struct.unpack(">HH", moov[entry + 32:entry + 36])
+            # Number of samples, i.e. frames
+            stsz = _child(moov, *stbl, b"stsz")
+            if stsz is not None:
+                frames = struct.unpack(">I", moov[stsz[0] + 8:stsz[0] + 12])[0]
+        if not (width and height):
+            # Fall back to the track header's display size (16.16 fixed point)
+            tkhd = _child(moov, trak_start, trak_end, b"tkhd")
+            if tkhd is not None:
+                p = tkhd[0] + (88 if moov[tkhd[0]] == 1 else 76)
+                width, height = (v >> 16 for v in struct.unpack(">II", moov[p:p + 8]))
+
+        frame_rate = frames / duration if frames and duration else None
+        return MediaInfo("video", video_format, width, height, duration, frame_rate)
+
+    raise ProbeError("File has no video track")
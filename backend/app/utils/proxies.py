@@ -0,0 +1,14 @@
+import os
+
+# Naming of clip render proxies. Kept apart from video_processor so the API
+# can find and delete proxies without importing OpenCV.
+
+
+def proxy_prefix(video_path: str) -> str:
+    """Common prefix of all render proxies of a clip (path or storage key)"""
+    return os.path.splitext(video_path)[0] + ".proxy_"
+
+
+def proxy_path_for(video_path: str, resolution: tuple, fps: int) -> str:
+    """Where the render proxy of a clip for these output settings lives"""
+    return f"{proxy_prefix(video_path)}{resolution[0]}x{resolution[1]}_{fps}.avi"
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# A segment file is complete once renamed from its .part name
+SEGMENT_NAME = "segment_{index:04d}.mp4"
+PART_NAME = "segment_{index:04d}.part.mp4"
+
+
+def ffmpeg_path() -> Optional[str]:
+    """The ffmpeg binary shipped with imageio-ffmpeg, or one on PATH"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+
+def checkpoint_name(output_path: str) -> str:
+    """
+    Checkpoint directory name of a render: its output name, which carries
+    the render fingerprint, so only an identical render resumes from it
+    """
+    return os.path.splitext(os.path.basename(output_path))[0]
+
+
+def segment_ranges(media_total: int, segment_media: int) -> List[Tuple[int, int]]:
+    """[start, end) media indexes of each segment; the intro goes with the first, the outro with the last"""
+    if media_total == 0:
+        return [(0, 0)]
+    return [
+        (start, min(start + segment_media, media_total))
+        for start in range(0, media_total, segment_media)
+    ]
+
+
+class RenderCheckpoint:
+    """
+    Finished segments of one render on local disk, listed in a manifest.
+    A render restarted after its worker died skips the segments already
+    listed, then joins all segments into the output without re-encoding.
+    """
+
+    def __init__(self, directory: str, media_total: int, segment_media: int):
+        self.directory = directory
+        self.segments = segment_ranges(media_total, segment_media)
+        self.layout = {"media_total": media_total, "segment_media": segment_media}
+        os.makedirs(directory, exist_ok=True)
+        self.completed: Dict[int, dict] = self._load()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def _load(self) -> Dict[int, dict]:
+        """Completed segments whose files are still intact"""
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("layout") != self.layout:
+            # Split differently (settings changed); nothing can be reused
+            logger.info(f"Discarding render checkpoint {self.directory} with another layout")
+            self.discard()
+            os.makedirs(self.directory, exist_ok=True)
+            return {}
+
+        completed = {}
+        for entry in manifest.get("segments", []):
+            path = os.path.join(self.directory, entry["file"])
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            if size == entry["size"]:
+                completed[entry["index"]] = entry
+        return completed
+
+    def _save(self) -> None:
+        manifest = {
+            "layout": self.layout,
+            "segments": [self.completed[index] for index in sorted(self.completed)],
+        }
+        temp_path = self._manifest_path() + ".part"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._manifest_path())
+
+    def is_complete(self, index: int) -> bool:
+        return index in self.completed
+
+    def frames(self, index: int) -> int:
+        return self.completed[index]["frames"]
+
+    def part_path(self, index: int) -> str:
+        """Where segment index is written while it renders"""
+        return os.path.join(self.directory, PART_NAME.format(index=index))
+
+    def complete(self, index: int, frames: int) -> None:
+        """Publish the written segment and record it in the manifest"""
+        name = SEGMENT_NAME.format(index=index)
+        path = os.path.join(self.directory, name)
+        os.replace(self.part_path(index), path)
+        start, end = self.segments[index]
+        self.completed[index] = {
+            "index": index,
+            "file": name,
+            "media_start": start,
+            "media_end": end,
+            "frames": frames,
+            "size": os.path.getsize(path),
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save()
+
+    @property
+    def resumed_segments(self) -> int:
+        return len(self.completed)
+
+    def concat(self, output_path: str, fps: int, resolution: tuple, fourcc: int) -> None:
+        """
+        Join the segments into output_path. ffmpeg copies the encoded
+        streams as they are; without it the segments are decoded and
+        encoded again with OpenCV.
+        """
+        paths = [
+            os.path.join(self.directory, self.completed[index]["file"])
+            for index in range(len(self.segments))
+        ]
+        if len(paths) == 1:
+            shutil.copyfile(paths[0], output_path)
+            return
+
+        ffmpeg = ffmpeg_path()
+        if ffmpeg:
+            list_path = os.path.join(self.directory, "segments.txt")
+            with open(list_path, "w") as f:
+                for path in paths:
+                    f.write(f"file '{os.path.abspath(path)}'\n")
+            subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", "-f", "mp4", output_path],
+                check=True, capture_output=True
+            )
+            return
+
+        logger.warning("ffmpeg not found; re-encoding render segments to join them")
+        import cv2
+        writer = cv2.VideoWriter(output_path, fourcc, fps, tuple(resolution))
+        try:
+            for path in paths:
+                capture = cv2.VideoCapture(path)
+                try:
+                    while True:
+                        ok, frame = capture.read()
+                        if not ok:
+                            break
+                        writer.write(frame)
+                finally:
+                    capture.release()
+        finally:
+            writer.release()
+
+    def discard(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def remove_stale_checkpoints(root: str, max_age_seconds: float, keep: Optional[set] = None) -> int:
+    """
+    Delete checkpoint directories under root untouched for max_age_seconds,
+    except those named in keep (renders still queued or running). Returns
+    how many were deleted.
+    """
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in entries:
+        if not entry.is_dir() or (keep and entry.name in keep):
+            continue
+        if entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,154 @@
+import cProfile
+import io
+import pstats
+import random
+import time
+from typing import Dict, List, Optional
+
+from app.core.metrics import registry
+
+registry.describe(
+    "render_stage_seconds", "histogram",
+    "Time spent in each render pipeline stage per call"
+)
+registry.describe(
+    "render_media_seconds", "histogram",
+    "Time to render one media item, by media type"
+)
+registry.describe("render_frames_total", "counter", "Frames written to rendered videos")
+registry.describe("render_jobs_total", "counter", "Finished renders by outcome")
+
+
+class _NullStage:
+    """Reusable no-op context manager"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullInstrumentation:
+    """Instrumentation backend that records nothing"""
+
+    enabled = False
+
+    def start(self) -> None:
+        pass
+
+    def stop(self, success: bool) -> None:
+        pass
+
+    def stage(self, name: str) -> _NullStage:
+        return _NULL_STAGE
+
+    def media(self, index: int, filename: str, media_type: str) -> _NullStage:
+        return _NULL_STAGE
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def summary(self) -> Dict:
+        return {}
+
+
+class _Timer:
+    def __init__(self, on_done):
+        self.on_done = on_done
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.on_done(time.perf_counter() - self.started)
+        return False
+
+
+class RenderInstrumentation(NullInstrumentation):
+    """
+    Collects per-stage and per-media timings and counters for one render,
+    optionally under cProfile, and exports them to the metrics registry
+    """
+
+    enabled = True
+
+    def __init__(self, profile_sample_rate: float = 0.0, profile_top: int = 25):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.media_items: List[Dict] = []
+        self.counters: Dict[str, int] = {}
+        self.profile_top = profile_top
+        self.profiler: Optional[cProfile.Profile] = (
+            cProfile.Profile() if random.random() < profile_sample_rate else None
+        )
+        self.profile_report: Optional[str] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        if self.profiler:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another render in this process is already being profiled
+                self.profiler = None
+
+    def stop(self, success: bool) -> None:
+        self.elapsed = time.perf_counter() - self.started
+        if self.profiler:
+            self.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(
+                self.profile_top
+            )
+            self.profile_report = out.getvalue()
+        registry.inc("render_jobs_total", outcome="success" if success else "failure")
+        registry.inc("render_frames_total", self.counters.get("frames_written", 0))
+
+    def _record_stage(self, name: str, seconds: float) -> None:
+        totals = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+        totals["calls"] += 1
+        totals["seconds"] += seconds
+        registry.observe("render_stage_seconds", seconds, stage=name)
+
+    def stage(self, name: str) -> _Timer:
+        return _Timer(lambda seconds: self._record_stage(name, seconds))
+
+    def media(self, index: int, filename: str, media_type: str) -> _Timer:
+        def record(seconds: float) -> None:
+            self.media_items.append({
+                "index": index,
+                "filename": filename,
+                "type": media_type,
+                "seconds": round(seconds, 4),
+            })
+            registry.observe("render_media_seconds", seconds, type=media_type)
+
+        return _Timer(record)
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict:
+        return {
+            "elapsed_seconds": round(self.elapsed, 4),
+            "stages": {
+                name: {"calls": int(t["calls"]), "seconds": round(t["seconds"], 4)}
+                for name, t in sorted(self.stages.items())
+            },
+            "media": self.media_items,
+            "counters": self.counters,
+            "profile": self.profile_report,
+        }
+
+
+def create_instrumentation(enabled: bool, profile_sample_rate: float = 0.0) -> NullInstrumentation:
+    if not enabled:
+        return NullInstrumentation()
+    return RenderInstrumentation(profile_sample_rate=profile_sample_rate)
@@ -0,0 +1,201 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Timeline of a render; VideoProcessor.create_video_from_media follows it
+CLIP_MAX_DURATION = 5  # Seconds of each clip used in a render
+IMAGE_SECONDS = 1
+INTRO_SECONDS = 3
+OUTRO_SECONDS = 2
+
+# Cost model in seconds per megapixel; rough figures measured with
+# OpenCV 4.12 on one x86 server core
+ENCODE_SECONDS_PER_MP = 0.009  # Per output frame: fades, copy and mp4v encode
+IMAGE_DECODE_SECONDS_PER_MP = 0.015  # Per decoded source image
+IMAGE_PREPARE_SECONDS_PER_MP = 0.06  # Per image at output size: resize, style, overlay
+CLIP_DECODE_SECONDS_PER_MP = 0.0035  # Per decoded source clip frame
+CLIP_RESIZE_SECONDS_PER_MP = 0.03  # Per output frame of a clip without a proxy
+
+# Frames held besides the buffered ones: decoded, resized, styled, current
+WORKING_FRAMES = 4
+# Output-sized frames of scratch memory while a photo is styled (float math)
+IMAGE_STYLE_FRAMES = 20
+# Copies of a decoded photo held at once: PIL's, the RGB array and the BGR one
+IMAGE_DECODE_COPIES = 3
+
+
+def fade_frames(fps: int) -> int:
+    """
+    Frames of each fade in or out: TRANSITION_FRAMES at VIDEO_FPS, the same
+    length in time at other frame rates, so previews match full renders
+    """
+    return max(1, settings.TRANSITION_FRAMES * fps // settings.VIDEO_FPS)
+
+
+class RenderBudgetError(Exception):
+    """A render is too large for the configured budgets"""
+
+    def __init__(self, detail: str, status_code: int = 413):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class RenderPlan:
+    """
+    Size and cost of a render, worked out from stored media metadata
+    before it starts, and how to run it:
+
+    - buffered: each photo or clip is rendered into a list of frames,
+      then encoded (fastest, memory grows with the longest item)
+    - streaming: frames go to the encoder as they are made, so only a
+      few are in memory at once
+    """
+
+    def __init__(self, frames: int, decode_mp: float, estimated_seconds: float,
+                 buffered_mb: float, streaming_mb: float, proxies: int, clips: int):
+        self.frames = frames
+        self.decode_mp = decode_mp
+        self.estimated_seconds = estimated_seconds
+        self.buffered_mb = buffered_mb
+        self.streaming_mb = streaming_mb
+        self.proxies = proxies
+        self.clips = clips
+        self.strategy = "buffered"
+
+    @property
+    def streaming(self) -> bool:
+        return self.strategy == "streaming"
+
+    @property
+    def peak_memory_mb(self) -> float:
+        return self.streaming_mb if self.streaming else self.buffered_mb
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "frames": self.frames,
+            "decode_megapixels": round(self.decode_mp, 1),
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "peak_memory_mb": round(self.peak_memory_mb, 1),
+            "clips": self.clips,
+            "clip_proxies": self.proxies,
+        }
+
+
+def _megapixels(size: Tuple[int, int]) -> float:
+    return size[0] * size[1] / 1e6
+
+
+def _mb(pixels: float) -> float:
+    # BGR, one byte per channel
+    return pixels * 3 / (1024 * 1024)
+
+
+def _decoded_size(media: dict, resolution: Tuple[int, int]) -> Tuple[int, int]:
+    """Size an image is decoded at; JPEGs decode reduced to just cover the output"""
+    width = media.get('width') or resolution[0]
+    height = media.get('height') or resolution[1]
+    if media.get('mime_type') == "image/jpeg":
+        scale = 1
+        while scale < 8 and width // (scale * 2) >= resolution[0] and height // (scale * 2) >= resolution[1]:
+            scale *= 2
+        width, height = math.ceil(width / scale), math.ceil(height / scale)
+    return width, height
+
+
+def plan_render(media_list: List[dict], output: dict, has_proxy: Optional[List[bool]] = None) -> RenderPlan:
+    """
+    Estimate frames, decode work, time and peak memory of a render.
+
+    media_list holds the render's media dicts ('type', and 'width',
+    'height', 'duration', 'frame_rate', 'mime_type' where known; without
+    them media count as output-sized and clips as CLIP_MAX_DURATION long).
+    has_proxy says per item whether a clip proxy exists for these output
+    settings.
+    """
+    fps = output["fps"]
+    resolution = tuple(output["resolution"])
+    output_mp = _megapixels(resolution)
+    frame_mb = _mb(resolution[0] * resolution[1])
+    has_proxy = has_proxy or [False] * len(media_list)
+
+    title_frames = (INTRO_SECONDS + OUTRO_SECONDS) * fps
+    frames = title_frames
+    decode_mp = 0.0
+    seconds = title_frames * ENCODE_SECONDS_PER_MP * output_mp
+    # Titles keep their fade frames; the static frames share one array
+    buffered_mb = (2 * fade_frames(fps) + 1) * frame_mb
+    streaming_mb = WORKING_FRAMES * frame_mb
+    clips = proxies = 0
+
+    for media, proxy in zip(media_list, has_proxy):
+        if media['type'] == 'image':
+            item_frames = IMAGE_SECONDS * fps
+            source = _decoded_size(media, resolution)
+            item_decode_mp = _megapixels(source)
+            seconds += (
+                item_decode_mp * IMAGE_DECODE_SECONDS_PER_MP
+                + output_mp * IMAGE_PREPARE_SECONDS_PER_MP
+            )
+            # Decoding and styling happen before any frame is made
+            working_mb = (
+                IMAGE_DECODE_COPIES * _mb(source[0] * source[1])
+                + IMAGE_STYLE_FRAMES * frame_mb
+            )
+        elif media['type'] == 'video':
+            clips += 1
+            duration = min(media.get('duration') or CLIP_MAX_DURATION, CLIP_MAX_DURATION)
+            item_frames = int(duration * fps)
+            if proxy:
+                # Proxies are already at output size and frame rate
+                proxies += 1
+                source = resolution
+                source_frames = item_frames
+            else:
+                source = (media.get('width') or resolution[0], media.get('height') or resolution[1])
+                source_frames = int(duration * (media.get('frame_rate') or fps))
+                seconds += item_frames * CLIP_RESIZE_SECONDS_PER_MP * output_mp
+            item_decode_mp = source_frames * _megapixels(source)
+            seconds += item_decode_mp * CLIP_DECODE_SECONDS_PER_MP
+            working_mb = _mb(source[0] * source[1]) + WORKING_FRAMES * frame_mb
+        else:
+            continue
+
+        frames += item_frames
+        decode_mp += item_decode_mp
+        seconds += item_frames * ENCODE_SECONDS_PER_MP * output_mp
+        buffered_mb = max(buffered_mb, working_mb, (WORKING_FRAMES + item_frames) * frame_mb)
+        streaming_mb = max(streaming_mb, working_mb)
+
+    return RenderPlan(frames, decode_mp, seconds, buffered_mb, streaming_mb, proxies, clips)
+
+
+def apply_budgets(plan: RenderPlan, preview: bool) -> RenderPlan:
+    """
+    Pick the strategy for a plan within the configured budgets: renders
+    that would buffer more than RENDER_MEMORY_BUDGET_MB stream instead.
+    Raises RenderBudgetError for renders over a budget either way.
+    """
+    hint = "" if preview else "; a preview render may fit"
+    if settings.RENDER_MAX_FRAMES and plan.frames > settings.RENDER_MAX_FRAMES:
+        raise RenderBudgetError(
+            f"Video would be {plan.frames} frames, more than the limit of "
+            f"{settings.RENDER_MAX_FRAMES}{hint}"
+        )
+    if settings.RENDER_MAX_ESTIMATED_SECONDS and plan.estimated_seconds > settings.RENDER_MAX_ESTIMATED_SECONDS:
+        raise RenderBudgetError(
+            f"Video would take about {round(plan.estimated_seconds)} s to render, more than "
+            f"the limit of {settings.RENDER_MAX_ESTIMATED_SECONDS:g} s{hint}"
+        )
+
+    budget = settings.RENDER_MEMORY_BUDGET_MB
+    if budget and plan.buffered_mb > budget:
+        plan.strategy = "streaming"
+        if plan.streaming_mb > budget:
+            raise RenderBudgetError(
+                f"Video needs about {round(plan.streaming_mb)} MB to render, more than "
+                f"the limit of {budget} MB"
+            )
+    return plan
@@ -2,24 +2,52 @@
 import cv2
 import numpy as np
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional
 import logging
-from PIL import Image
+import os
+import threading
+import time
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+from app.utils.proxies import proxy_path_for
+from app.utils.render_checkpoint import RenderCheckpoint
+from app.utils.render_instrumentation import NullInstrumentation
+from app.utils.render_plan import (
+    CLIP_MAX_DURATION, IMAGE_SECONDS, INTRO_SECONDS, OUTRO_SECONDS, fade_frames
+)
 from app.utils.video_styles import VideoStyles
 
 logger = logging.getLogger(__name__)
 
+# Clip proxies are intra-only Motion JPEG, so any frame decodes on its own
+PROXY_CODEC = "MJPG"
+
 
 class VideoProcessor:
     """Process images and videos into a compiled video story"""
     
+    # Static title frames keyed by (text, resolution), shared across renders
+    TITLE_CACHE_SIZE = 8
+    _title_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+    _title_cache_lock = threading.Lock()
+    
+    # Pre-rendered text masks keyed by (text, font, scale, thickness)
+    SPRITE_CACHE_SIZE = 256
+    _sprite_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+    _sprite_cache_lock = threading.Lock()
+    
     def __init__(
         self,
         output_path: str,
         fps: int = 30,
         resolution: tuple = (1920, 1080),
         codec: str = "mp4v",
-        style: str = "cinematic"  # Add style parameter
+        style: str = "cinematic",  # Add style parameter
+        instrumentation: Optional[NullInstrumentation] = None,
+        font_path: Optional[str] = None,
+        hw_decode: bool = False,
+        preview: bool = False,
+        streaming: bool = False
     ):
         self.output_path = output_path
         self.fps = fps
@@ -27,12 +55,32 @@ class VideoProcessor:
         self.codec = codec
         self.style = style  # Store style
         self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        # Fades last as long in time whatever the frame rate
+        self.fade_frames = fade_frames(fps)
+        # Per-stage timers; the null backend records nothing
+        self.instrumentation = instrumentation or NullInstrumentation()
+        # Optional TrueType font for text overlays
+        self.font_path = font_path
+        # Ask OpenCV for hardware video decoding where the backend supports it
+        self.hw_decode = hw_decode
+        # Previews trade resampling quality for speed
+        self.preview = preview
+        self.interpolation = cv2.INTER_LINEAR if preview else cv2.INTER_LANCZOS4
+        # Text sizes are designed for 1080p; scale them with the output
+        self.text_scale = resolution[1] / 1080
+        # Encode each frame as it is made instead of buffering a whole
+        # photo or clip; chosen by the render plan for large renders
+        self.streaming = streaming
         
     def resize_and_pad(self, image: np.ndarray) -> np.ndarray:
         """Resize image to fit resolution while maintaining aspect ratio"""
         target_width, target_height = self.resolution
         height, width = image.shape[:2]
         
+        # Already the right size (e.g. frames from a clip proxy)
+        if (width, height) == (target_width, target_height):
+            return image
+        
         # Calculate aspect ratios
         target_aspect = target_width / target_height
         image_aspect = width / height
@@ -47,7 +95,7 @@ class VideoProcessor:
             new_width = int(target_height * image_aspect)
         
         # Resize image
-        resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+        resized = cv2.resize(image, (new_width, new_height), interpolation=self.interpolation)
         
         # Create black canvas and center the image
         canvas = np.zeros((target_height, target_width, 3), dtype=np.uint8)
@@ -65,97 +113,171 @@ class VideoProcessor:
         """Apply fade-out effect to frame"""
         return cv2.addWeighted(frame, 1 - alpha, np.zeros_like(frame), alpha, 0)
     
+    def _text_sprite(self, text: str, font_scale: float, thickness: int) -> dict:
+        """
+        Pre-render text as an alpha mask, cached across frames and renders.
+        Uses the TrueType font at font_path when set, else Hershey simplex.
+        Returns the mask with the text origin inside it and the text metrics.
+        """
+        key = (text, self.font_path, font_scale, thickness)
+        with VideoProcessor._sprite_cache_lock:
+            sprite = VideoProcessor._sprite_cache.get(key)
+            if sprite is not None:
+                VideoProcessor._sprite_cache.move_to_end(key)
+                return sprite
+        
+        font = None
+        if self.font_path:
+            try:
+                font = ImageFont.truetype(self.font_path, int(font_scale * 32))
+            except OSError as e:
+                logger.warning(f"Cannot load font {self.font_path}, using default: {str(e)}")
+        
+        if font is not None:
+            # Bounding box relative to the left end of the baseline
+            left, top, right, bottom = font.getbbox(text, anchor="ls")
+            mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)), 0)
+            ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor="ls")
+            alpha = np.asarray(mask, dtype=np.float32)
+            origin = (-left, -top)
+            text_width, text_height, baseline = right - left, -top, bottom
+        else:
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            (text_width, text_height), baseline = cv2.getTextSize(
+                text, font, font_scale, thickness
+            )
+            # Strokes can reach about two thicknesses past the reported box
+            pad = 2 * thickness + 2
+            mask = np.zeros(
+                (text_height + baseline + 2 * pad, text_width + 2 * pad), dtype=np.uint8
+            )
+            origin = (pad, pad + text_height)
+            cv2.putText(mask, text, origin, font, font_scale, 255, thickness, cv2.LINE_AA)
+            alpha = mask.astype(np.float32)
+        
+        sprite = {
+            'alpha': (alpha / 255.0)[:, :, None],
+            'origin': origin,
+            'width': text_width,
+            'height': text_height,
+            'baseline': baseline,
+        }
+        with VideoProcessor._sprite_cache_lock:
+            VideoProcessor._sprite_cache[key] = sprite
+            while len(VideoProcessor._sprite_cache) > VideoProcessor.SPRITE_CACHE_SIZE:
+                VideoProcessor._sprite_cache.popitem(last=False)
+        return sprite
+    
     def add_text_overlay(
         self, 
         frame: np.ndarray, 
         text: str, 
         position: str = "bottom"
     ) -> np.ndarray:
-        """Add text overlay to frame"""
+        """
+        Add text overlay to frame
+        
+        Only the text box is touched: it is darkened and the cached text
+        sprite is blended into it. The frame is modified in place and returned.
+        """
         height, width = frame.shape[:2]
         
         # Configure text
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 1.5
-        thickness = 3
-        color = (255, 255, 255)  # White
+        scale = self.text_scale
+        font_scale = 1.5 * scale
+        thickness = max(1, round(3 * scale))
+        margin = int(100 * scale)
+        pad = int(20 * scale)
+        color = np.array((255, 255, 255), dtype=np.float32)  # White
         
-        # Get text size
-        (text_width, text_height), baseline = cv2.getTextSize(
-            text, font, font_scale, thickness
-        )
+        sprite = self._text_sprite(text, font_scale, thickness)
+        text_width = sprite['width']
+        text_height = sprite['height']
+        baseline = sprite['baseline']
         
         # Calculate position
         if position == "bottom":
             x = (width - text_width) // 2
-            y = height - 100
+            y = height - margin
         elif position == "top":
             x = (width - text_width) // 2
-            y = 100
+            y = margin
         else:  # center
             x = (width - text_width) // 2
             y = (height + text_height) // 2
         
-        # Add semi-transparent background
-        overlay = frame.copy()
-        cv2.rectangle(
-            overlay,
-            (x - 20, y - text_height - 20),
-            (x + text_width + 20, y + baseline + 20),
-            (0, 0, 0),
-            -1
-        )
-        frame = cv2.addWeighted(frame, 0.7, overlay, 0.3, 0)
+        # Darken the text box only (same as a 30% black overlay)
+        x0, y0 = max(x - pad, 0), max(y - text_height - pad, 0)
+        x1, y1 = min(x + text_width + pad + 1, width), min(y + baseline + pad + 1, height)
+        if x0 < x1 and y0 < y1:
+            box = frame[y0:y1, x0:x1]
+            cv2.convertScaleAbs(box, dst=box, alpha=0.7)
         
-        # Add text
-        cv2.putText(
-            frame,
-            text,
-            (x, y),
-            font,
-            font_scale,
-            color,
-            thickness,
-            cv2.LINE_AA
-        )
+        # Blend the sprite into the frame, clipped to the frame edges
+        alpha = sprite['alpha']
+        origin_x, origin_y = sprite['origin']
+        sx, sy = x - origin_x, y - origin_y
+        fx0, fy0 = max(sx, 0), max(sy, 0)
+        fx1 = min(sx + alpha.shape[1], width)
+        fy1 = min(sy + alpha.shape[0], height)
+        if fx0 < fx1 and fy0 < fy1:
+            region = frame[fy0:fy1, fx0:fx1]
+            a = alpha[fy0 - sy:fy1 - sy, fx0 - sx:fx1 - sx]
+            blended = region + (color - region) * a
+            region[:] = (blended + 0.5).astype(np.uint8)
         
         return frame
     
-    def process_image(
+    def load_image(self, image_path: str) -> np.ndarray:
+        """Decode an image file into a BGR frame"""
+        # Read image using PIL first (better format support)
+        pil_image = Image.open(image_path)
+        
+        # Let JPEGs decode at a reduced scale that still covers the output
+        # resolution; resize_and_pad scales the rest of the way
+        if pil_image.format == 'JPEG':
+            pil_image.draft('RGB', tuple(self.resolution))
+        
+        # Convert to RGB if necessary
+        if pil_image.mode != 'RGB':
+            pil_image = pil_image.convert('RGB')
+        
+        # Convert PIL to OpenCV format
+        return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    
+    def iter_image_frames(
         self,
         image_path: str,
         duration: int = 1,
-        transition_frames: int = 15,
+        transition_frames: Optional[int] = None,
         add_text: str = None
-    ) -> List[np.ndarray]:
-        """Process a single image into video frames"""
-        try:
-            # Read image using PIL first (better format support)
-            pil_image = Image.open(image_path)
-            
-            # Convert to RGB if necessary
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # Convert PIL to OpenCV format
-            image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
-            
-            # Resize and pad to target resolution
+    ) -> Iterator[np.ndarray]:
+        """Yield the video frames of a single image; fades default to self.fade_frames"""
+        instrumentation = self.instrumentation
+        if transition_frames is None:
+            transition_frames = self.fade_frames
+        
+        with instrumentation.stage("decode"):
+            image = self.load_image(image_path)
+        
+        # Resize and pad to target resolution
+        with instrumentation.stage("resize"):
             processed = self.resize_and_pad(image)
-            
-            # Apply artistic style
+        del image
+        
+        # Apply artistic style
+        with instrumentation.stage(f"style_{self.style}"):
             processed = VideoStyles.apply_style(processed, self.style)
-            
-            # Add text overlay if provided
-            if add_text:
+        
+        # Add text overlay if provided
+        if add_text:
+            with instrumentation.stage("text_overlay"):
                 processed = self.add_text_overlay(processed, add_text)
-            
-            # Calculate total frames
-            total_frames = duration * self.fps
-            frames = []
-            
-            # Generate frames with transitions
-            for i in range(total_frames):
+        
+        # Generate frames with transitions
+        total_frames = duration * self.fps
+        for i in range(total_frames):
+            with instrumentation.stage("fades"):
                 frame = processed.copy()
                 
                 # Fade in at start
@@ -167,9 +289,19 @@ class VideoProcessor:
                 elif i > total_frames - transition_frames:
                     alpha = (total_frames - i) / transition_frames
                     frame = self.apply_fade_out(frame, 1 - alpha)
-                
-                frames.append(frame)
             
+            yield frame
+    
+    def process_image(
+        self,
+        image_path: str,
+        duration: int = 1,
+        transition_frames: Optional[int] = None,
+        add_text: str = None
+    ) -> List[np.ndarray]:
+        """Process a single image into video frames"""
+        try:
+            frames = list(self.iter_image_frames(image_path, duration, transition_frames, add_text))
             logger.info(f"Processed image: {image_path} -> {len(frames)} frames")
             return frames
             
@@ -177,42 +309,151 @@ class VideoProcessor:
             logger.error(f"Error processing image {image_path}: {str(e)}")
             return []
     
-    def process_video_clip(
+    def open_video(self, video_path: str) -> cv2.VideoCapture:
+        """Open a clip for decoding, with hardware decoding if enabled"""
+        if self.hw_decode:
+            return cv2.VideoCapture(
+                video_path,
+                cv2.CAP_ANY,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            )
+        return cv2.VideoCapture(video_path)
+    
+    def iter_video_clip(
         self,
         video_path: str,
-        max_duration: int = 5
-    ) -> List[np.ndarray]:
-        """Process a video clip (limit duration and resize)"""
+        max_duration: float = 5
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield the frames of a clip resampled to self.fps and resized
+        
+        The clip is resampled from its own frame rate to self.fps so it
+        plays at real speed, and max_duration is in seconds of the clip.
+        Source frames that are not needed are skipped with grab() without
+        being decoded to an image; when the source has fewer frames per
+        second than the output, frames are repeated.
+        """
+        cap = self.open_video(video_path)
         try:
-            cap = cv2.VideoCapture(video_path)
-            frames = []
-            max_frames = max_duration * self.fps
-            frame_count = 0
+            source_fps = cap.get(cv2.CAP_PROP_FPS)
+            if not source_fps or source_fps != source_fps or source_fps <= 0:
+                # Unknown rate (NaN or 0): assume it matches the output
+                source_fps = self.fps
+            step = source_fps / self.fps
+            max_frames = int(max_duration * self.fps)
+            
+            instrumentation = self.instrumentation
+            source_index = -1  # Index of the last grabbed source frame
+            processed = None
             
-            while cap.isOpened() and frame_count < max_frames:
-                ret, frame = cap.read()
+            for output_index in range(max_frames):
+                wanted = int(output_index * step + 1e-6)
+                
+                if wanted == source_index and processed is not None:
+                    # Slower source: repeat the previous frame
+                    yield processed
+                    continue
+                
+                with instrumentation.stage("clip_decode"):
+                    grabbed = True
+                    while source_index < wanted:
+                        grabbed = cap.grab()
+                        if not grabbed:
+                            break
+                        source_index += 1
+                    ret, frame = cap.retrieve() if grabbed else (False, None)
                 if not ret:
                     break
                 
                 # Resize to target resolution
-                processed = self.resize_and_pad(frame)
-                frames.append(processed)
-                frame_count += 1
-            
+                with instrumentation.stage("resize"):
+                    processed = self.resize_and_pad(frame)
+                yield processed
+        finally:
             cap.release()
-            logger.info(f"Processed video: {video_path} -> {len(frames)} frames")
+    
+    def clip_source(self, video_path: str) -> str:
+        """The normalized proxy of a clip when ingest has made one, else the clip"""
+        proxy_path = proxy_path_for(video_path, self.resolution, self.fps)
+        return proxy_path if os.path.exists(proxy_path) else video_path
+    
+    def process_video_clip(
+        self,
+        video_path: str,
+        max_duration: float = 5
+    ) -> List[np.ndarray]:
+        """Process a video clip (limit duration, match fps and resize)"""
+        try:
+            source_path = self.clip_source(video_path)
+            frames = list(self.iter_video_clip(source_path, max_duration))
+            logger.info(f"Processed video: {source_path} -> {len(frames)} frames")
             return frames
             
         except Exception as e:
             logger.error(f"Error processing video {video_path}: {str(e)}")
             return []
     
+    def create_proxy(
+        self,
+        video_path: str,
+        max_duration: float = 5,
+        proxy_path: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Transcode a clip once into a render proxy: self.resolution, self.fps,
+        at most max_duration seconds, Motion JPEG so every frame is a
+        keyframe and cheap to decode. Written to proxy_path, by default
+        next to the clip.
+        
+        Returns:
+            The proxy path, or None if the clip could not be transcoded
+        """
+        if proxy_path is None:
+            proxy_path = proxy_path_for(video_path, self.resolution, self.fps)
+        # Keep the .avi extension so OpenCV picks the container
+        temp_path = proxy_path[:-len(".avi")] + ".part.avi"
+        writer = cv2.VideoWriter(
+            temp_path,
+            cv2.VideoWriter_fourcc(*PROXY_CODEC),
+            self.fps,
+            tuple(self.resolution)
+        )
+        try:
+            if not writer.isOpened():
+                logger.error(f"Failed to open proxy writer for {video_path}")
+                return None
+            
+            frame_count = 0
+            for frame in self.iter_video_clip(video_path, max_duration):
+                writer.write(frame)
+                frame_count += 1
+            writer.release()
+            
+            if frame_count == 0:
+                logger.warning(f"No frames decoded from {video_path}, skipping proxy")
+                os.remove(temp_path)
+                return None
+            
+            # Renders only ever see a complete proxy
+            os.replace(temp_path, proxy_path)
+            logger.info(f"Created proxy: {proxy_path} ({frame_count} frames)")
+            return proxy_path
+            
+        except Exception as e:
+            logger.error(f"Error creating proxy for {video_path}: {str(e)}")
+            writer.release()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+    
     def create_video_from_media(
         self,
         media_files: List[dict],
         title: str = None,
         add_intro: bool = True,
-        add_outro: bool = True
+        add_outro: bool = True,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+        checkpoint: Optional[RenderCheckpoint] = None
     ) -> bool:
         """
         Create video from list of media files
@@ -222,124 +463,272 @@ class VideoProcessor:
             title: Optional title for intro
             add_intro: Add title intro screen
             add_outro: Add outro screen
+            progress_callback: Called after each stage with a dict of
+                'stage', 'media_index', 'media_total', 'frames_written',
+                'fps' (frames written per second) and 'eta_seconds'
+            checkpoint: Render in segments, each published to the
+                checkpoint as it finishes, skipping those it already has,
+                then join them into output_path
         
         Returns:
             bool: Success status
         """
         try:
-            # Initialize video writer
-            writer = cv2.VideoWriter(
-                self.output_path,
-                self.fourcc,
-                self.fps,
-                self.resolution
-            )
-            
-            if not writer.isOpened():
-                logger.error("Failed to open video writer")
-                return False
-            
-            all_frames = []
+            # Frames are written as soon as each stage produces them
+            self._started_at = time.monotonic()
+            self._frames_written = 0
+            self._resumed_media = 0
+            media_total = len(media_files)
+            instrumentation = self.instrumentation
+            instrumentation.start()
             
-            # Add intro if requested
-            if add_intro and title:
-                intro_frames = self.create_title_screen(title, duration=3)
-                all_frames.extend(intro_frames)
-            
-            # Process each media file
-            for idx, media in enumerate(media_files):
-                logger.info(f"Processing media {idx + 1}/{len(media_files)}: {media['filename']}")
-                
-                if media['type'] == 'image':
-                    frames = self.process_image(
-                        media['path'],
-                        duration=1,  # 1 second per photo
-                        transition_frames=15,
-                        add_text=f"{idx + 1}/{len(media_files)}"
-                    )
-                elif media['type'] == 'video':
-                    frames = self.process_video_clip(
-                        media['path'],
-                        max_duration=5
-                    )
-                else:
-                    logger.warning(f"Unknown media type: {media['type']}")
+            segments = checkpoint.segments if checkpoint else [(0, media_total)]
+            for segment, (start, end) in enumerate(segments):
+                if checkpoint and checkpoint.is_complete(segment):
+                    self._frames_written += checkpoint.frames(segment)
+                    self._resumed_media = end
+                    logger.info(f"Resuming after segment {segment} (media {start + 1}-{end})")
                     continue
                 
-                all_frames.extend(frames)
-            
-            # Add outro if requested
-            if add_outro:
-                outro_frames = self.create_title_screen(
-                    "Thank you for watching!",
-                    duration=2
+                # Initialize video writer
+                writer = cv2.VideoWriter(
+                    checkpoint.part_path(segment) if checkpoint else self.output_path,
+                    self.fourcc,
+                    self.fps,
+                    self.resolution
                 )
-                all_frames.extend(outro_frames)
-            
-            # Write all frames to video
-            logger.info(f"Writing {len(all_frames)} frames to video...")
-            for frame in all_frames:
-                writer.write(frame)
+                
+                if not writer.isOpened():
+                    logger.error("Failed to open video writer")
+                    return False
+                frames_before = self._frames_written
+                
+                # Add intro if requested
+                if segment == 0 and add_intro and title:
+                    self._write_title(writer, title, INTRO_SECONDS)
+                    self._report_progress(progress_callback, "intro", 0, media_total)
+                
+                # Process each media file
+                for idx in range(start, end):
+                    media = media_files[idx]
+                    logger.info(f"Processing media {idx + 1}/{len(media_files)}: {media['filename']}")
+                    
+                    with instrumentation.media(idx, media['filename'], media['type']):
+                        if media['type'] not in ('image', 'video'):
+                            logger.warning(f"Unknown media type: {media['type']}")
+                            continue
+                        if self.streaming:
+                            self._stream_media(writer, media, idx, media_total)
+                        elif media['type'] == 'image':
+                            # Passed straight on so the frames are freed once written
+                            self._write_frames(writer, self.process_image(
+                                media['path'],
+                                duration=IMAGE_SECONDS,
+                                transition_frames=self.fade_frames,
+                                add_text=f"{idx + 1}/{len(media_files)}"
+                            ))
+                        else:
+                            self._write_frames(writer, self.process_video_clip(
+                                media['path'],
+                                max_duration=CLIP_MAX_DURATION
+                            ))
+                    self._report_progress(progress_callback, "media", idx + 1, media_total)
+                
+                # Add outro if requested
+                if segment == len(segments) - 1 and add_outro:
+                    self._write_title(writer, "Thank you for watching!", OUTRO_SECONDS)
+                
+                with instrumentation.stage("encode_finalize"):
+                    writer.release()
+                if checkpoint:
+                    checkpoint.complete(segment, self._frames_written - frames_before)
             
-            writer.release()
-            logger.info(f"Video created successfully: {self.output_path}")
+            if checkpoint:
+                with instrumentation.stage("concat_segments"):
+                    checkpoint.concat(self.output_path, self.fps, self.resolution, self.fourcc)
+            instrumentation.stop(success=True)
+            self._report_progress(progress_callback, "done", media_total, media_total)
+            logger.info(
+                f"Video created successfully: {self.output_path} "
+                f"({self._frames_written} frames)"
+            )
             return True
             
         except Exception as e:
             logger.error(f"Error creating video: {str(e)}")
+            self.instrumentation.stop(success=False)
             return False
     
-    def create_title_screen(self, text: str, duration: int = 3) -> List[np.ndarray]:
-        """Create a title screen with text"""
-        frames = []
+    def _write_frames(self, writer: cv2.VideoWriter, frames: List[np.ndarray]) -> None:
+        """Write frames to the video and count them"""
+        with self.instrumentation.stage("encode"):
+            for frame in frames:
+                writer.write(frame)
+        self._frames_written += len(frames)
+        self.instrumentation.count("frames_written", len(frames))
+    
+    def _stream_media(
+        self,
+        writer: cv2.VideoWriter,
+        media: dict,
+        idx: int,
+        media_total: int
+    ) -> None:
+        """Encode one photo or clip frame by frame as it is made"""
+        if media['type'] == 'image':
+            frames: Iterable[np.ndarray] = self.iter_image_frames(
+                media['path'],
+                duration=IMAGE_SECONDS,
+                transition_frames=self.fade_frames,
+                add_text=f"{idx + 1}/{media_total}"
+            )
+        else:
+            frames = self.iter_video_clip(
+                self.clip_source(media['path']),
+                max_duration=CLIP_MAX_DURATION
+            )
+        
+        try:
+            written = self._encode_each(writer, frames)
+            logger.info(f"Streamed {media['type']}: {media['path']} -> {written} frames")
+        except Exception as e:
+            # As in process_image / process_video_clip: skip what cannot be read
+            logger.error(f"Error processing {media['type']} {media['path']}: {str(e)}")
+    
+    def _write_title(self, writer: cv2.VideoWriter, text: str, duration: int) -> None:
+        if self.streaming:
+            self._encode_each(writer, self.iter_title_screen(text, duration))
+            return
+        with self.instrumentation.stage("title_screen"):
+            frames = self.create_title_screen(text, duration=duration)
+        self._write_frames(writer, frames)
+    
+    def _encode_each(self, writer: cv2.VideoWriter, frames: Iterable[np.ndarray]) -> int:
+        """Encode frames one at a time as they are made; returns how many"""
+        written = 0
+        try:
+            for frame in frames:
+                with self.instrumentation.stage("encode"):
+                    writer.write(frame)
+                written += 1
+        finally:
+            self._frames_written += written
+            self.instrumentation.count("frames_written", written)
+        return written
+    
+    def _report_progress(
+        self,
+        progress_callback: Optional[Callable[[dict], None]],
+        stage: str,
+        media_index: int,
+        media_total: int
+    ) -> None:
+        """Send a progress snapshot to the callback, if any"""
+        if progress_callback is None:
+            return
+        
+        elapsed = time.monotonic() - self._started_at
+        fps_achieved = self._frames_written / elapsed if elapsed > 0 else 0.0
+        
+        # Estimate remaining time from the average time per media item
+        # rendered by this run; a resumed render skipped the others
+        rendered = media_index - self._resumed_media
+        if stage == "done":
+            eta = 0.0
+        elif rendered > 0:
+            eta = elapsed / rendered * (media_total - media_index)
+        else:
+            eta = None
+        
+        try:
+            progress_callback({
+                'stage': stage,
+                'media_index': media_index,
+                'media_total': media_total,
+                'frames_written': self._frames_written,
+                'fps': round(fps_achieved, 2),
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+            })
+        except Exception as e:
+            # Progress reporting must never break a render
+            logger.warning(f"Progress callback failed: {str(e)}")
+    
+    def _title_base_frame(self, text: str) -> np.ndarray:
+        """
+        Build the static title frame for text at this resolution, or reuse
+        the one cached from an earlier title screen or render
+        """
+        key = (text, tuple(self.resolution))
+        with VideoProcessor._title_cache_lock:
+            frame = VideoProcessor._title_cache.get(key)
+            if frame is not None:
+                VideoProcessor._title_cache.move_to_end(key)
+                return frame
+        
+        # Create black background
+        frame = np.zeros((self.resolution[1], self.resolution[0], 3), dtype=np.uint8)
+        
+        # Add gradient background
+        gradient = np.linspace(0, 100, self.resolution[1], dtype=np.uint8)
+        frame[:, :, 0] = gradient[:, None]  # Blue channel
+        frame[:, :, 1] = gradient[:, None] * 0.5  # Green channel
+        
+        # Add text
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 2.5 * self.text_scale
+        thickness = max(1, round(4 * self.text_scale))
+        color = (255, 255, 255)
+        
+        # Get text size
+        (text_width, text_height), _ = cv2.getTextSize(
+            text, font, font_scale, thickness
+        )
+        
+        # Center text
+        x = (self.resolution[0] - text_width) // 2
+        y = (self.resolution[1] + text_height) // 2
+        
+        cv2.putText(
+            frame,
+            text,
+            (x, y),
+            font,
+            font_scale,
+            color,
+            thickness,
+            cv2.LINE_AA
+        )
+        
+        with VideoProcessor._title_cache_lock:
+            VideoProcessor._title_cache[key] = frame
+            while len(VideoProcessor._title_cache) > VideoProcessor.TITLE_CACHE_SIZE:
+                VideoProcessor._title_cache.popitem(last=False)
+        return frame
+    
+    def iter_title_screen(self, text: str, duration: int = 3) -> Iterator[np.ndarray]:
+        """Yield the frames of a title screen; see create_title_screen"""
+        base = self._title_base_frame(text)
         total_frames = duration * self.fps
         
         for i in range(total_frames):
-            # Create black background
-            frame = np.zeros((self.resolution[1], self.resolution[0], 3), dtype=np.uint8)
-            
-            # Add gradient background
-            gradient = np.linspace(0, 100, self.resolution[1], dtype=np.uint8)
-            frame[:, :, 0] = gradient[:, None]  # Blue channel
-            frame[:, :, 1] = gradient[:, None] * 0.5  # Green channel
-            
-            # Add text
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 2.5
-            thickness = 4
-            color = (255, 255, 255)
-            
-            # Get text size
-            (text_width, text_height), _ = cv2.getTextSize(
-                text, font, font_scale, thickness
-            )
-            
-            # Center text
-            x = (self.resolution[0] - text_width) // 2
-            y = (self.resolution[1] + text_height) // 2
-            
-            cv2.putText(
-                frame,
-                text,
-                (x, y),
-                font,
-                font_scale,
-                color,
-                thickness,
-                cv2.LINE_AA
-            )
-            
             # Apply fade in/out
-            if i < 15:  # Fade in
-                alpha = i / 15
-                frame = self.apply_fade_in(frame, alpha)
-            elif i > total_frames - 15:  # Fade out
-                alpha = (total_frames - i) / 15
-                frame = self.apply_fade_out(frame, 1 - alpha)
-            
-            frames.append(frame)
+            if i < self.fade_frames:  # Fade in
+                alpha = i / self.fade_frames
+                yield self.apply_fade_in(base, alpha)
+            elif i > total_frames - self.fade_frames:  # Fade out
+                alpha = (total_frames - i) / self.fade_frames
+                yield self.apply_fade_out(base, 1 - alpha)
+            else:
+                yield base
+    
+    def create_title_screen(self, text: str, duration: int = 3) -> List[np.ndarray]:
+        """
+        Create a title screen with text
         
-        return frames
+        The frame is drawn once and shared: every frame between the fades is
+        the same cached array, so callers must not modify frames in place.
+        """
+        return list(self.iter_title_screen(text, duration))
 
 
 def create_video_from_images(
@@ -0,0 +1,132 @@
+"""
+API worker startup benchmark
+
+Imports the API app (main) in fresh interpreters and reports import time,
+resident memory afterwards, whether the render stack (OpenCV, NumPy, PIL)
+was pulled in, and the slowest imports from -X importtime, as JSON. Exits
+with status 1 when the render stack is loaded at import time or RSS is
+over the budget, so it can gate CI.
+
+Usage:
+    python benchmarks/api_startup.py --runs 5
+    python benchmarks/api_startup.py --rss-budget-mb 150 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+from app.core.process_info import render_stack_loaded, rss_mb
+print(json.dumps({
+    "import_seconds": elapsed,
+    "rss_mb": rss_mb(),
+    "render_stack_loaded": render_stack_loaded(),
+}))
+"""
+
+
+def run_probe() -> Dict:
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> List[Dict]:
+    """Modules with the largest cumulative import time, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:  <self us> | <cumulative us> | <indented module>"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        modules.append({
+            "module": name.strip(),
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+        })
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args) -> Dict:
+    runs = [run_probe() for _ in range(args.runs)]
+    import_times = [run["import_seconds"] for run in runs]
+    rss = [run["rss_mb"] for run in runs if run["rss_mb"] is not None]
+    render_stack = sorted({name for run in runs for name in run["render_stack_loaded"]})
+    rss_median = statistics.median(rss) if rss else None
+
+    failures = []
+    if render_stack:
+        failures.append(f"render stack loaded at import time: {', '.join(render_stack)}")
+    if args.rss_budget_mb and rss_median is not None and rss_median > args.rss_budget_mb:
+        failures.append(f"RSS {rss_median} MB over budget of {args.rss_budget_mb} MB")
+
+    return {
+        "benchmark": "api_startup",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "import_seconds": {
+            "median": round(statistics.median(import_times), 4),
+            "min": round(min(import_times), 4),
+            "max": round(max(import_times), 4),
+        },
+        "rss_mb": {"median": rss_median, "budget": args.rss_budget_mb or None},
+        "render_stack_loaded": render_stack,
+        "slowest_imports": slowest_imports(args.top),
+        "failures": failures,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument(
+        "--rss-budget-mb", type=float, default=None,
+        help="Fail above this RSS (default: API_RSS_BUDGET_MB from settings)"
+    )
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.rss_budget_mb is None:
+        sys.path.append(str(BACKEND_DIR))
+        os.chdir(BACKEND_DIR)
+        from app.core.config import settings
+        args.rss_budget_mb = settings.API_RSS_BUDGET_MB
+
+    report = main(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    sys.exit(1 if report["failures"] else 0)
@@ -0,0 +1,96 @@
+"""
+Login throughput benchmark
+
+Compares bcrypt verification run inline on the event loop (the old
+CRUDUser.authenticate path) with the process-pool path used by
+authenticate_async. Reports logins/s and the worst event-loop stall seen
+by a heartbeat task, as JSON.
+
+Usage:
+    python benchmarks/login_throughput.py --logins 64 --concurrency 16 --rounds 12
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from passlib.context import CryptContext
+
+from app.core import security
+from app.core.config import settings
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the largest delay between ticks while the benchmark runs"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_mode(mode: str, hashed: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                return security.verify_password("password", hashed)
+            return await security.verify_password_async("password", hashed)
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_stall = await monitor
+
+    assert all(results), "password verification failed"
+    return {
+        "mode": mode,
+        "logins": logins,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "logins_per_second": round(logins / elapsed, 2),
+        "max_event_loop_stall_ms": round(worst_stall * 1000, 2),
+    }
+
+
+async def main(args) -> dict:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    hashed = context.hash("password")
+
+    # Warm the pool so process start-up is not counted
+    await security.verify_password_async("password", hashed)
+
+    results = []
+    for mode in ("inline", "process_pool"):
+        results.append(await run_mode(mode, hashed, args.logins, args.concurrency))
+
+    return {
+        "benchmark": "login_throughput",
+        "bcrypt_rounds": args.rounds,
+        "hash_workers": settings.PASSWORD_HASH_WORKERS,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        security.shutdown_hash_executor()
+    print(json.dumps(report, indent=2))
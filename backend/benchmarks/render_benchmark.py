@@ -0,0 +1,263 @@
+"""
+Render pipeline benchmark
+
+Generates synthetic photos and clips at several source resolutions, times
+each stage of VideoProcessor (decode, resize_and_pad, every VideoStyles
+style, text overlay, fades, title screens, clip decode, encode) and an
+end-to-end create_video_from_media run, and prints the results as JSON.
+Nothing in uploads/ is needed.
+
+Usage:
+    python benchmarks/render_benchmark.py --output results.json
+    python benchmarks/render_benchmark.py --sources 1280x720 3840x2160 --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.utils.video_processor import VideoProcessor
+from app.utils.video_styles import VideoStyles
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STYLES = ["cinematic", "vintage", "vibrant", "black_and_white"]
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def synthetic_frame(width: int, height: int, seed: int) -> np.ndarray:
+    """A textured BGR frame so styles and encoders do representative work"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:, :, 0] = (x[None, :] * 0.8 + y[:, None] * 0.2).astype(np.uint8)
+    frame[:, :, 1] = (y[:, None] * 0.7).astype(np.uint8) + 30
+    frame[:, :, 2] = ((x[None, :] + y[:, None]) / 2).astype(np.uint8)
+    noise = rng.integers(0, 40, size=frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+def make_image(path: str, width: int, height: int, seed: int) -> None:
+    frame = synthetic_frame(width, height, seed)
+    Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).save(path, quality=90)
+
+
+def make_clip(path: str, width: int, height: int, fps: int, seconds: float) -> None:
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    base = synthetic_frame(width, height, seed=7)
+    for i in range(int(fps * seconds)):
+        writer.write(np.roll(base, i * 8, axis=1))
+    writer.release()
+
+
+def time_stage(fn: Callable[[], object], repeat: int, frames_per_call: int = 1) -> Dict:
+    """Run fn repeat times after one warm-up call and summarise the timings"""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    mean = sum(timings) / len(timings)
+    return {
+        "calls": repeat,
+        "mean_ms": round(mean * 1000, 3),
+        "best_ms": round(best * 1000, 3),
+        "frames_per_second": round(frames_per_call / mean, 2) if mean > 0 else None,
+    }
+
+
+def bench_source(
+    workdir: str, source: Tuple[int, int], output: Tuple[int, int], fps: int, repeat: int
+) -> Dict:
+    width, height = source
+    image_path = os.path.join(workdir, f"photo_{width}x{height}.jpg")
+    clip_path = os.path.join(workdir, f"clip_{width}x{height}.mp4")
+    make_image(image_path, width, height, seed=width)
+    make_clip(clip_path, width, height, fps=fps, seconds=2)
+
+    processor = VideoProcessor(
+        output_path=os.path.join(workdir, "encode.mp4"),
+        fps=fps,
+        resolution=output,
+    )
+    image = processor.load_image(image_path)
+    frame = processor.resize_and_pad(image)
+
+    stages = {
+        "decode": time_stage(lambda: processor.load_image(image_path), repeat),
+        "resize_and_pad": time_stage(lambda: processor.resize_and_pad(image), repeat),
+    }
+    for style in STYLES:
+        np.random.seed(0)
+        stages[f"style_{style}"] = time_stage(
+            lambda style=style: VideoStyles.apply_style(frame, style), repeat
+        )
+    stages["text_overlay"] = time_stage(
+        lambda: processor.add_text_overlay(frame, "12/34"), repeat
+    )
+    stages["fade_in"] = time_stage(lambda: processor.apply_fade_in(frame, 0.5), repeat)
+    stages["fade_out"] = time_stage(lambda: processor.apply_fade_out(frame, 0.5), repeat)
+    stages["title_screen"] = time_stage(
+        lambda: processor.create_title_screen("My Travel Story", duration=1),
+        max(1, repeat // 2),
+        frames_per_call=fps,
+    )
+    stages["clip_decode"] = time_stage(
+        lambda: processor.process_video_clip(clip_path, max_duration=2),
+        max(1, repeat // 2),
+        frames_per_call=fps * 2,
+    )
+
+    def encode():
+        writer = cv2.VideoWriter(processor.output_path, processor.fourcc, fps, output)
+        for _ in range(fps):
+            writer.write(frame)
+        writer.release()
+
+    stages["encode"] = time_stage(encode, max(1, repeat // 2), frames_per_call=fps)
+
+    return {
+        "source_resolution": f"{width}x{height}",
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_end_to_end(
+    workdir: str,
+    source: Tuple[int, int],
+    output: Tuple[int, int],
+    fps: int,
+    photos: int,
+    style: str,
+) -> Dict:
+    width, height = source
+    media = []
+    for i in range(photos):
+        path = os.path.join(workdir, f"e2e_{i:03d}.jpg")
+        make_image(path, width, height, seed=i)
+        media.append({"path": path, "type": "image", "filename": Path(path).name})
+    clip_path = os.path.join(workdir, "e2e_clip.mp4")
+    make_clip(clip_path, width, height, fps=fps, seconds=2)
+    media.append({"path": clip_path, "type": "video", "filename": "e2e_clip.mp4"})
+
+    processor = VideoProcessor(
+        output_path=os.path.join(workdir, "e2e_output.mp4"),
+        fps=fps,
+        resolution=output,
+        style=style,
+    )
+    progress = {}
+    started = time.perf_counter()
+    success = processor.create_video_from_media(
+        media,
+        title="Benchmark Trip",
+        progress_callback=progress.update,
+    )
+    elapsed = time.perf_counter() - started
+
+    frames = progress.get("frames_written", 0)
+    return {
+        "success": success,
+        "source_resolution": f"{width}x{height}",
+        "style": style,
+        "media_items": len(media),
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "frames_per_second": round(frames / elapsed, 2) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(args) -> Dict:
+    output = parse_resolution(args.output_resolution)
+    sources: List[Tuple[int, int]] = [parse_resolution(s) for s in args.sources]
+
+    with tempfile.TemporaryDirectory(prefix="render-bench-") as workdir:
+        per_source = [
+            bench_source(workdir, source, output, args.fps, args.repeat)
+            for source in sources
+        ]
+        end_to_end = bench_end_to_end(
+            workdir, sources[-1], output, args.fps, args.photos, args.style
+        )
+
+    return {
+        "benchmark": "render",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "output_resolution": args.output_resolution,
+        "fps": args.fps,
+        "sources": per_source,
+        "end_to_end": end_to_end,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sources", nargs="+", default=["1280x720", "1920x1080", "3840x2160"],
+        help="Source resolutions of the synthetic media"
+    )
+    parser.add_argument("--output-resolution", default="1920x1080")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per stage")
+    parser.add_argument("--photos", type=int, default=8, help="Photos in the end-to-end run")
+    parser.add_argument("--style", default="cinematic", help="Style for the end-to-end run")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = main(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
@@ -1,5 +1,5 @@
 from app.database import engine
-from app.models import user, trip, media
+from app.models import user, trip, media, render_job
 
 def create_tables():
     from app.database import Base
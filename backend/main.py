@@ -1,7 +1,11 @@
-from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from typing import List
+import asyncio
+import mimetypes
 import os
 from pathlib import Path
 from sqlalchemy.orm import Session
@@ -11,6 +15,20 @@ from app.core.config import settings
 from app.database import SessionLocal  # ← FIXED
 from app import crud, models, schemas
 from app.api import deps
+from app.api.v1.endpoints.ai import resume_render_job
+from app.api.v1.endpoints.upload import create_clip_proxies, probe_upload
+from app.core import security
+from app.core.media_gc import collector
+from app.core.metrics import registry
+from app.core.process_info import (
+    is_primary_worker, process_stats, report_worker_health, worker_stats
+)
+from app.core.render_scheduler import scheduler
+from app.core.render_watchdog import report_render_heartbeats, watchdog
+from app.core.response_cache import response_cache
+from app.core.storage import LocalStorage, storage
+from app.core.request_metrics import RequestMetricsMiddleware, install_query_hooks
+from app.database import engine
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -26,15 +44,87 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and per-request SQL query metrics
+if settings.REQUEST_METRICS_ENABLED:
+    install_query_hooks(engine)
+    app.add_middleware(RequestMetricsMiddleware)
+
 # Create uploads directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-# Mount static files for serving videos and images
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# Serve videos and images: straight from disk for local storage,
+# streamed through the storage backend otherwise
+if isinstance(storage, LocalStorage):
+    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+else:
+    @app.get("/uploads/{key:path}")
+    def read_upload(key: str):
+        if not storage.exists(key):
+            raise HTTPException(status_code=404, detail="File not found")
+        media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        return StreamingResponse(storage.iter_chunks(key), media_type=media_type)
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("shutdown")
+def shutdown_hash_executor():
+    security.shutdown_hash_executor()
+
+@app.on_event("startup")
+def start_media_gc():
+    # One collector per deployment is enough; under serve.py worker 0 runs it
+    if settings.GC_ENABLED and is_primary_worker():
+        collector.start()
+
+@app.on_event("shutdown")
+def stop_media_gc():
+    collector.stop(timeout=5)
+
+@app.on_event("startup")
+def start_render_watchdog():
+    # Requeued renders run in the worker that finds them; one is enough
+    if settings.RENDER_WATCHDOG_ENABLED and is_primary_worker():
+        watchdog.start(resume=resume_render_job)
+
+@app.on_event("shutdown")
+def stop_render_watchdog():
+    # Before the scheduler drains, so nothing is requeued while stopping
+    watchdog.stop(timeout=5)
+
+@app.on_event("shutdown")
+def shutdown_render_scheduler():
+    scheduler.shutdown(timeout=settings.RENDER_SHUTDOWN_TIMEOUT)
+
+_health_reporter = None
+
+@app.on_event("startup")
+async def start_worker_health():
+    global _health_reporter
+    _health_reporter = asyncio.create_task(
+        report_worker_health(lambda: scheduler.stats()["running"])
+    )
+
+@app.on_event("shutdown")
+async def stop_worker_health():
+    if _health_reporter is not None:
+        _health_reporter.cancel()
+
+_render_heartbeat = None
+
+@app.on_event("startup")
+async def start_render_heartbeat():
+    # Every worker: each keeps its own queued and running renders alive
+    global _render_heartbeat
+    _render_heartbeat = asyncio.create_task(
+        report_render_heartbeats(settings.RENDER_HEARTBEAT_INTERVAL)
+    )
+
+@app.on_event("shutdown")
+async def stop_render_heartbeat():
+    if _render_heartbeat is not None:
+        _render_heartbeat.cancel()
+
 @app.get("/")
 async def root():
     return {
@@ -45,10 +135,30 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "trip-tales-api"}
+    return {
+        "status": "healthy",
+        "service": "trip-tales-api",
+        "user_cache": crud.user.cache.stats(),
+        "token_cache": security.token_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "process": process_stats(),
+        "workers": worker_stats(),
+        "renders": scheduler.stats(),
+        "render_watchdog": watchdog.stats(),
+        "media_gc": collector.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-style metrics for this process"""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
 
 @app.post("/upload/")
 async def upload_files(
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     trip_id: int = Form(None),
     db: Session = Depends(deps.get_db)
@@ -61,6 +171,7 @@ async def upload_files(
         raise HTTPException(status_code=400, detail="No files provided")
     
     saved_files = []
+    video_keys = []
     
     for file in files:
         try:
@@ -79,12 +190,15 @@ async def upload_files(
                     detail=f"File type {file.content_type} not allowed"
                 )
             
-            # Save file
-            file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
+            # Reject damaged or mislabeled files before storing them
+            info = await run_in_threadpool(probe_upload, file)
             
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            # Stream the upload into storage
+            file_key = storage.shard_key(file.filename)
+            file.file.seek(0, os.SEEK_END)
+            file_size = file.file.tell()
+            file.file.seek(0)
+            await run_in_threadpool(storage.save, file_key, file.file)
             
             # If trip_id provided, create MediaFile record
             if trip_id:
@@ -93,16 +207,19 @@ async def upload_files(
                 media_in = schemas.MediaFileCreate(
                     filename=file.filename,
                     original_filename=file.filename,
-                    file_path=file_path,
-                    file_size=len(content),
+                    file_path=file_key,
+                    file_size=file_size,
                     mime_type=file.content_type,
                     file_type=file_type,
-                    trip_id=trip_id
+                    trip_id=trip_id,
+                    **info.as_dict()
                 )
                 
-                crud.media_file.create(db=db, obj_in=media_in)
+                crud.media_file.create_with_trip(db=db, obj_in=media_in)
             
             saved_files.append(file.filename)
+            if file.content_type.startswith("video"):
+                video_keys.append(file_key)
             
         except Exception as e:
             raise HTTPException(
@@ -110,6 +227,10 @@ async def upload_files(
                 detail=f"Error uploading file {file.filename}: {str(e)}"
             )
     
+    # Prepare render proxies for clips after the response is sent
+    if settings.VIDEO_PROXY_ENABLED and video_keys:
+        background_tasks.add_task(create_clip_proxies, video_keys)
+    
     return {
         "uploaded": saved_files,
         "count": len(saved_files)
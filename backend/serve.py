@@ -0,0 +1,181 @@
+"""
+Production server for the Trip Tales API
+
+Binds the listening socket once, imports the app (unless preloading is
+off) and forks worker processes that share the socket, replacing any that
+exit. On SIGTERM or SIGINT every worker stops accepting connections,
+finishes in-flight requests and uploads within SERVER_GRACEFUL_TIMEOUT,
+then lets queued renders finish within RENDER_SHUTDOWN_TIMEOUT; workers
+still running after that are killed. Worker health is reported under
+`workers` on /health.
+
+Usage:
+    python serve.py
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.process_info import WorkerTable, set_worker
+
+logger = logging.getLogger("uvicorn.error")
+
+# A worker that exits sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.table = WorkerTable(workers)
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(index)
+            except BaseException:
+                logger.exception(f"Worker {index} crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        self.table.update(index, pid=pid, started_at=time.time(), heartbeat_at=0)
+        logger.info(f"Started worker {index} [{pid}]")
+
+    def _run_worker(self, index: int) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        set_worker(index, self.table)
+        # Connections are not safe to share across fork; drop any the parent opened
+        from app.database import engine
+        engine.dispose(close=False)
+        uvicorn.Server(self.config).run(sockets=[self.sock])
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while not self.stopping:
+            self._reap()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def _reap(self) -> None:
+        """Replace workers that exited, e.g. crashed or hit SERVER_MAX_REQUESTS"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.warning(f"Worker {index} [{pid}] exited with {code}, restarting")
+            if time.time() - self.table.get(index, "started_at") < MIN_WORKER_LIFETIME:
+                # Do not spin when a worker cannot start at all
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.table.update(index, restarts=self.table.get(index, "restarts") + 1)
+            self.spawn(index)
+
+    def shutdown(self) -> None:
+        logger.info(f"Stopping {len(self.children)} workers")
+        # No more workers will be started; once the workers close their copies,
+        # new connections are refused instead of waiting in the backlog
+        self.sock.close()
+        for pid in self.children:
+            self._signal(pid, signal.SIGTERM)
+
+        # Requests drain first, then queued renders, then the app shuts down
+        deadline = time.monotonic() + (
+            settings.SERVER_GRACEFUL_TIMEOUT + settings.RENDER_SHUTDOWN_TIMEOUT + 10
+        )
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.2)
+
+        for pid, index in self.children.items():
+            logger.warning(f"Worker {index} [{pid}] did not stop in time, killing it")
+            self._signal(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+
+def main(args) -> None:
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs os.fork; on Windows run uvicorn main:app --workers N")
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and settings.STATUS_BROKER == "memory":
+        logger.warning(
+            "STATUS_BROKER=memory only reaches clients connected to the rendering "
+            "worker; set STATUS_BROKER=file when running several workers"
+        )
+
+    config = uvicorn.Config(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY or None,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        proxy_headers=True,
+    )
+    sock = config.bind_socket()
+    if args.preload:
+        # Workers share the imported app's pages copy-on-write; the render
+        # stack is still loaded per worker on its first render
+        config.load()
+
+    logger.info(f"Serving on {args.host}:{args.port} with {workers} workers")
+    Supervisor(config, sock, workers).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVER_WORKERS,
+        help="Worker processes (default: SERVER_WORKERS, 0 = one per CPU)"
+    )
+    parser.add_argument(
+        "--no-preload", dest="preload", action="store_false", default=settings.SERVER_PRELOAD,
+        help="Import the app in each worker instead of once before forking"
+    )
+    main(parser.parse_args())
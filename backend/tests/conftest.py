@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read at import time: point them at a scratch directory first
+_scratch = tempfile.mkdtemp(prefix="trip-tales-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_scratch, "uploads")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STATUS_EVENTS_DIR"] = os.path.join(_scratch, "events")
+os.environ["RENDER_CHECKPOINT_DIR"] = os.path.join(_scratch, "renders")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db():
+    from app.database import Base, SessionLocal, engine
+    from app import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def upload_dir():
+    from app.core.config import settings
+
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    yield settings.UPLOAD_DIR
+    for name in os.listdir(settings.UPLOAD_DIR):
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        if os.path.isfile(path):
+            os.remove(path)
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app import crud, models
+from app.api.v1.endpoints import ai
+from app.core.render_scheduler import scheduler
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        scheduler, "submit", lambda user_id, lane, fn, memory_mb=0.0, **kwargs: calls.append(kwargs)
+    )
+    return calls
+
+
+@pytest.fixture
+def trip(db, upload_dir):
+    user = models.User(email="a@example.com", username="a", hashed_password="x")
+    db.add(user)
+    db.commit()
+    trip = models.Trip(title="Coast", owner_id=user.id, status="draft")
+    db.add(trip)
+    db.commit()
+    for i in range(3):
+        name = f"photo{i}.jpg"
+        with open(f"{upload_dir}/{name}", "wb") as f:
+            f.write(b"jpeg")
+        db.add(models.MediaFile(
+            filename=name, original_filename=name, file_path=name, file_size=4,
+            mime_type="image/jpeg", file_type="image", width=640, height=480,
+            trip_id=trip.id
+        ))
+    db.commit()
+    return trip
+
+
+def _generate(db, trip, **params):
+    return ai.generate_video(
+        db=db, trip_id=trip.id, prompt=None, current_user=trip.owner, **params
+    )
+
+
+def test_identical_concurrent_requests_queue_one_render(db, trip, submitted):
+    async def double_click():
+        await asyncio.gather(_generate(db, trip), _generate(db, trip))
+
+    asyncio.run(double_click())
+    assert len(submitted) == 1
+    jobs = crud.render_job.get_unfinished(db, limit=10)
+    assert [job.id for job in jobs] == [submitted[0]["job_id"]]
+
+
+@pytest.fixture
+def published(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai.events, "publish_trip_event", lambda trip_id, **event: calls.append(event))
+    return calls
+
+
+@pytest.fixture
+def rendered_trip(db, trip):
+    trip.status = "completed"
+    trip.style = "cinematic"
+    trip.generated_video_url = "/uploads/trip.mp4"
+    db.commit()
+    return trip
+
+
+def _assert_trip_untouched(db, trip):
+    db.expire_all()
+    trip = crud.trip.get(db, id=trip.id)
+    assert (trip.status, trip.style, trip.generated_video_url) == (
+        "completed", "cinematic", "/uploads/trip.mp4"
+    )
+
+
+def test_preview_leaves_trip_alone(db, rendered_trip, submitted, published):
+    asyncio.run(_generate(db, rendered_trip, style="vintage", preview=True))
+
+    _assert_trip_untouched(db, rendered_trip)
+    assert submitted[0]["preview"]
+    assert published == [{"preview": {"job_id": submitted[0]["job_id"], "status": "queued"}}]
+
+
+def test_reused_preview_leaves_trip_alone(db, rendered_trip, upload_dir, published):
+    output = ai.render_settings(preview=True)
+    fingerprint = ai.render_fingerprint(
+        ai.render_media_list(rendered_trip.media_files), "vintage", "Coast", output
+    )
+    with open(f"{upload_dir}/preview.mp4", "wb") as f:
+        f.write(b"video")
+    job = models.RenderJob(
+        trip_id=rendered_trip.id, style="vintage", fingerprint=fingerprint,
+        output_path="preview.mp4", lane="preview", status="completed"
+    )
+    db.add(job)
+    db.commit()
+
+    asyncio.run(_generate(db, rendered_trip, style="vintage", preview=True))
+
+    _assert_trip_untouched(db, rendered_trip)
+    assert published == [{
+        "preview": {"job_id": job.id, "status": "completed"},
+        "preview_url": "/uploads/preview.mp4",
+    }]
+
+
+def test_failed_preview_fails_only_its_job(db, rendered_trip, submitted, published, monkeypatch):
+    asyncio.run(_generate(db, rendered_trip, style="vintage", preview=True))
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ai, "localize_media", broken)
+    ai.process_video_generation(**submitted[0])
+
+    _assert_trip_untouched(db, rendered_trip)
+    job = crud.render_job.get(db, id=submitted[0]["job_id"])
+    assert (job.status, job.error) == ("failed", "disk full")
+    assert published[-1] == {
+        "preview": {"job_id": job.id, "status": "failed", "error": "disk full"}
+    }
+    assert not any(ai.events.is_terminal(event) for event in published)
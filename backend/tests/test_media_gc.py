@@ -0,0 +1,55 @@
+import os
+import time
+
+from app import models
+from app.core.media_gc import MediaGarbageCollector
+
+GRACE_SECONDS = 3600
+
+
+def _write(directory: str, name: str, age_seconds: float = 0) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"video")
+    if age_seconds:
+        old = time.time() - age_seconds
+        os.utime(path, (old, old))
+    return path
+
+
+def _collector() -> MediaGarbageCollector:
+    return MediaGarbageCollector(
+        interval=60,
+        batch_size=100,
+        max_deletes_per_second=0,
+        grace_seconds=GRACE_SECONDS,
+        retention_days=0,
+        render_max_bytes=0
+    )
+
+
+def test_root_sweep_keeps_legacy_render_a_trip_points_to(db, upload_dir):
+    user = models.User(email="a@example.com", username="a", hashed_password="x")
+    db.add(user)
+    db.commit()
+    # Rendered before render jobs existed: only the trip refers to it
+    db.add(models.Trip(
+        title="Old trip",
+        owner_id=user.id,
+        status="completed",
+        generated_video_url="/uploads/trip_1_cinematic.mp4"
+    ))
+    db.commit()
+
+    legacy = _write(upload_dir, "trip_1_cinematic.mp4", age_seconds=2 * GRACE_SECONDS)
+    stray = _write(upload_dir, "trip_2_cinematic.mp4", age_seconds=2 * GRACE_SECONDS)
+    fresh = _write(upload_dir, "upload_in_flight.jpg")
+
+    collector = _collector()
+    assert collector.shards[0] is None  # The first pass sweeps the unsharded root
+    result = collector.run_pass()
+
+    assert os.path.exists(legacy)
+    assert not os.path.exists(stray)
+    assert os.path.exists(fresh)
+    assert result["deleted"] == {"unreferenced": 1}
@@ -0,0 +1,116 @@
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+from app.api.v1.endpoints.upload import probe_upload
+from app.utils.media_probe import ProbeError, probe
+
+WIDTH, HEIGHT = 64, 48
+
+
+def _image(fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (WIDTH, HEIGHT), (200, 100, 50)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _video(tmp_path, name: str, fourcc: str, fps: int = 10, frames: int = 20) -> bytes:
+    path = os.path.join(tmp_path, name)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (WIDTH, HEIGHT))
+    assert writer.isOpened()
+    for i in range(frames):
+        writer.write(np.full((HEIGHT, WIDTH, 3), i * 10, np.uint8))
+    writer.release()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def mp4(tmp_path):
+    return _video(tmp_path, "clip.mp4", "mp4v")
+
+
+@pytest.fixture
+def avi(tmp_path):
+    return _video(tmp_path, "clip.avi", "MJPG")
+
+
+@pytest.mark.parametrize("fmt, name", [("JPEG", "jpeg"), ("PNG", "png"), ("GIF", "gif")])
+def test_images_round_trip(fmt, name):
+    info = probe(io.BytesIO(_image(fmt)))
+    assert (info.kind, info.format, info.width, info.height) == ("image", name, WIDTH, HEIGHT)
+    assert info.duration is None
+
+
+def test_jpeg_size_found_past_exif_segment():
+    data = _image("JPEG")
+    # An APP1 segment before the frame header, as cameras write
+    app1 = b"Exif\x00\x00" + b"\x00" * 1000
+    data = data[:2] + b"\xff\xe1" + (len(app1) + 2).to_bytes(2, "big") + app1 + data[2:]
+    info = probe(io.BytesIO(data))
+    assert (info.width, info.height) == (WIDTH, HEIGHT)
+
+
+def test_mp4_round_trip(mp4):
+    info = probe(io.BytesIO(mp4))
+    assert (info.kind, info.format, info.width, info.height) == ("video", "mp4", WIDTH, HEIGHT)
+    assert info.duration == pytest.approx(2.0, abs=0.05)
+    assert info.frame_rate == pytest.approx(10.0, abs=0.1)
+
+
+def test_avi_round_trip(avi):
+    info = probe(io.BytesIO(avi))
+    assert (info.kind, info.format, info.width, info.height) == ("video", "avi", WIDTH, HEIGHT)
+    assert info.duration == pytest.approx(2.0, abs=0.05)
+    assert info.frame_rate == pytest.approx(10.0, abs=0.1)
+
+
+def test_probe_leaves_file_at_start(mp4):
+    f = io.BytesIO(mp4)
+    f.seek(100)
+    probe(f)
+    assert f.tell() == 0
+
+
+@pytest.mark.parametrize("make", [
+    lambda mp4, avi: _image("JPEG")[:20],
+    lambda mp4, avi: _image("PNG")[:-20],
+    lambda mp4, avi: _image("GIF")[:-1],
+    lambda mp4, avi: avi[:len(avi) // 2],
+    lambda mp4, avi: mp4[:len(mp4) // 2],
+], ids=["jpeg", "png", "gif", "avi", "mp4"])
+def test_truncated_files_are_rejected(make, mp4, avi):
+    with pytest.raises(ProbeError):
+        probe(io.BytesIO(make(mp4, avi)))
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image at all" * 10, b"RIFF\x00\x00\x00\x00WAVEfmt "])
+def test_unknown_formats_are_rejected(data):
+    with pytest.raises(ProbeError):
+        probe(io.BytesIO(data))
+
+
+def _upload(data: bytes, filename: str, content_type: str) -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data), filename=filename, headers=Headers({"content-type": content_type})
+    )
+
+
+def test_upload_of_matching_kind_passes(mp4):
+    info = probe_upload(_upload(mp4, "clip.mp4", "video/mp4"))
+    assert info.kind == "video"
+
+
+@pytest.mark.parametrize("filename, content_type", [("photo.mp4", "video/mp4"), ("photo.png", "image/png")])
+def test_mislabeled_upload_is_rejected(filename, content_type, mp4):
+    data = _image("JPEG") if content_type.startswith("video/") else mp4
+    with pytest.raises(HTTPException) as excinfo:
+        probe_upload(_upload(data, filename, content_type))
+    assert excinfo.value.status_code == 400
+    assert "not " + content_type in excinfo.value.detail
@@ -0,0 +1,87 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from app.utils.render_checkpoint import MANIFEST_NAME, RenderCheckpoint, segment_ranges
+
+FPS = 10
+SIZE = (64, 48)
+FOURCC = cv2.VideoWriter_fourcc(*"mp4v")
+
+
+def _render_segment(checkpoint: RenderCheckpoint, index: int, frames: int = 5) -> None:
+    writer = cv2.VideoWriter(checkpoint.part_path(index), FOURCC, FPS, SIZE)
+    for i in range(frames):
+        writer.write(np.full((SIZE[1], SIZE[0], 3), index * 40 + i, np.uint8))
+    writer.release()
+    checkpoint.complete(index, frames)
+
+
+def test_segment_ranges():
+    assert segment_ranges(25, 10) == [(0, 10), (10, 20), (20, 25)]
+    assert segment_ranges(0, 10) == [(0, 0)]
+
+
+def test_resume_skips_segments_in_manifest(tmp_path):
+    directory = str(tmp_path / "trip_1_cinematic_abc")
+    first = RenderCheckpoint(directory, media_total=25, segment_media=10)
+    _render_segment(first, 0, frames=7)
+    _render_segment(first, 1)
+    # The worker dies here, with a segment half written
+    open(first.part_path(2), "wb").write(b"partial")
+
+    resumed = RenderCheckpoint(directory, media_total=25, segment_media=10)
+    assert resumed.resumed_segments == 2
+    assert resumed.is_complete(0) and resumed.is_complete(1)
+    assert not resumed.is_complete(2)
+    assert resumed.frames(0) == 7
+
+
+def test_resumed_render_joins_all_segments(tmp_path):
+    directory = str(tmp_path / "render")
+    first = RenderCheckpoint(directory, media_total=3, segment_media=1)
+    _render_segment(first, 0)
+    _render_segment(first, 1)
+
+    resumed = RenderCheckpoint(directory, media_total=3, segment_media=1)
+    _render_segment(resumed, 2)
+    output = str(tmp_path / "out.mp4")
+    resumed.concat(output, FPS, SIZE, FOURCC)
+
+    capture = cv2.VideoCapture(output)
+    assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 15
+    capture.release()
+
+
+def test_other_layout_discards_checkpoint(tmp_path):
+    directory = str(tmp_path / "render")
+    first = RenderCheckpoint(directory, media_total=25, segment_media=10)
+    _render_segment(first, 0)
+
+    resumed = RenderCheckpoint(directory, media_total=25, segment_media=5)
+    assert resumed.resumed_segments == 0
+    assert os.listdir(directory) == []
+
+
+def test_damaged_segment_is_rendered_again(tmp_path):
+    directory = str(tmp_path / "render")
+    first = RenderCheckpoint(directory, media_total=25, segment_media=10)
+    _render_segment(first, 0)
+    _render_segment(first, 1)
+    with open(os.path.join(directory, "segment_0001.mp4"), "r+b") as f:
+        f.truncate(10)
+
+    resumed = RenderCheckpoint(directory, media_total=25, segment_media=10)
+    assert resumed.is_complete(0)
+    assert not resumed.is_complete(1)
+
+
+def test_unreadable_manifest_starts_over(tmp_path):
+    directory = str(tmp_path / "render")
+    os.makedirs(directory)
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        f.write(json.dumps({"layout": {"media_total": 25}})[:10])
+
+    assert RenderCheckpoint(directory, media_total=25, segment_media=10).resumed_segments == 0
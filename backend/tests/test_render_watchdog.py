@@ -0,0 +1,67 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from app import crud, models
+from app.core import render_watchdog
+from app.core.process_info import process_start_time, worker_id
+from app.core.render_scheduler import scheduler
+from app.core.render_watchdog import CLAIM_GRACE_SECONDS, watchdog
+
+NOW = datetime.now(timezone.utc)
+OLD = NOW - timedelta(seconds=CLAIM_GRACE_SECONDS + 1)
+
+
+def _job(worker: str, updated_at: datetime = OLD) -> models.RenderJob:
+    return models.RenderJob(id=1, worker=worker, created_at=updated_at, updated_at=updated_at)
+
+
+def test_job_claimed_here_but_unknown_to_scheduler_is_dead():
+    assert not scheduler.has_job(1)
+    assert watchdog._is_dead(_job(worker_id()), NOW)
+    # Just claimed; not submitted yet
+    assert not watchdog._is_dead(_job(worker_id(), updated_at=NOW), NOW)
+
+
+def test_reused_pid_is_dead():
+    pid = os.getppid()
+    host = socket.gethostname()
+    assert not watchdog._is_dead(_job(f"{host}:{pid}:{process_start_time(pid)}"), NOW)
+    assert watchdog._is_dead(_job(f"{host}:{pid}:1"), NOW)
+
+
+def test_other_host_is_dead_only_when_stale():
+    assert not watchdog._is_dead(_job("elsewhere:1:1"), NOW)
+    stale = NOW - timedelta(seconds=watchdog.stale_seconds + 1)
+    assert watchdog._is_dead(_job("elsewhere:1:1", updated_at=stale), NOW)
+
+
+def test_heartbeat_keeps_queued_job_of_other_host_alive(db, monkeypatch):
+    user = models.User(email="a@example.com", username="a", hashed_password="x")
+    db.add(user)
+    db.commit()
+    trip = models.Trip(title="Coast", owner_id=user.id, status="processing")
+    db.add(trip)
+    db.commit()
+    stale = NOW - timedelta(seconds=watchdog.stale_seconds + 1)
+    queued, finished = (
+        models.RenderJob(trip_id=trip.id, status=status, worker="elsewhere:1:1", updated_at=stale)
+        for status in ("queued", "completed")
+    )
+    db.add_all([queued, finished])
+    db.commit()
+    assert watchdog._is_dead(queued, NOW)
+
+    # The owning process's scheduler still holds both
+    monkeypatch.setattr(scheduler, "job_ids", lambda: [queued.id, finished.id])
+
+    async def one_beat():
+        task = asyncio.create_task(render_watchdog.report_render_heartbeats(interval=60))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(one_beat())
+    db.expire_all()
+    assert not watchdog._is_dead(crud.render_job.get(db, id=queued.id), NOW)
+    assert render_watchdog._as_utc(crud.render_job.get(db, id=finished.id).updated_at) == stale
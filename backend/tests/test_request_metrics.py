@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core import request_metrics
+from app.core.request_metrics import RequestStats, install_query_hooks
+
+
+def test_keeps_slowest_statements():
+    stats = RequestStats(keep_statements=2)
+    for seconds, statement in [(0.1, "a"), (0.5, "b"), (0.2, "c"), (3.0, "slow"), (0.05, "d")]:
+        stats.record(statement, seconds)
+
+    assert stats.query_count == 5
+    assert sorted(stats.statements, reverse=True) == [(3.0, "slow"), (0.5, "b")]
+
+
+def test_no_statements_kept_when_disabled():
+    stats = RequestStats(keep_statements=0)
+    stats.record("a", 1.0)
+    assert stats.statements == []
+
+
+def test_failed_statement_leaves_nothing_on_connection():
+    engine = create_engine("sqlite://")
+    install_query_hooks(engine)
+    stats = RequestStats(keep_statements=5)
+    token = request_metrics._current_request.set(stats)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("SELECT * FROM missing"))
+            conn.execute(text("SELECT 1"))
+            info = dict(conn.info)
+    finally:
+        request_metrics._current_request.reset(token)
+
+    assert info == {}
+    assert [statement for _, statement in stats.statements] == ["SELECT 1"]